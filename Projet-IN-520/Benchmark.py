@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import multiprocessing
+
+from Grammaire import Grammaire, ProfilPasses
+from Generateur import Generateur
+
+##############################
+# Grammaires synthétiques
+##############################
+NON_TERMINAUX = [chr(c) for c in range(ord('A'), ord('Z') + 1) if chr(c) != 'E']
+TERMINAUX = [chr(c) for c in range(ord('a'), ord('z') + 1)]
+
+def grammaire_synthetique(nb_non_terminaux=5, productions=3, longueur_droite=3, part_annulables=0.1,
+                          part_unitaires=0.1, part_recursives=0.1, taille_alphabet=3, graine=0):
+    """
+    Texte d'une grammaire .general tirée au hasard (même graine = même grammaire).
+    Chaque non-terminal a `productions` parties droites tirées ainsi :
+      - E avec la probabilité part_annulables
+      - un non-terminal seul (règle unitaire) avec la probabilité part_unitaires
+      - lui-même suivi d'une suite (récursivité gauche) avec la probabilité part_recursives
+      - sinon une suite de 1 à longueur_droite symboles, moitié terminaux
+    S'y ajoutent une lettre seule (tout est productif) et une lettre suivie du
+    non-terminal suivant (tout est accessible depuis l'axiome, le premier).
+    """
+    if not 1 <= nb_non_terminaux <= len(NON_TERMINAUX):
+        raise ValueError(f"nombre de non-terminaux entre 1 et {len(NON_TERMINAUX)}")
+    if not 1 <= taille_alphabet <= len(TERMINAUX):
+        raise ValueError(f"taille d'alphabet entre 1 et {len(TERMINAUX)}")
+    rng = random.Random(graine)
+    non_terminaux = NON_TERMINAUX[:nb_non_terminaux]
+    alphabet = TERMINAUX[:taille_alphabet]
+
+    def suite(longueur):
+        return "".join(rng.choice(non_terminaux) if rng.random() < 0.5 else rng.choice(alphabet)
+                       for _ in range(longueur))
+
+    lignes = []
+    for i, nt in enumerate(non_terminaux):
+        droites = {}
+        for _ in range(productions):
+            tirage = rng.random()
+            if tirage < part_annulables:
+                droite = "E"
+            elif tirage < part_annulables + part_unitaires:
+                droite = rng.choice(non_terminaux)
+            elif tirage < part_annulables + part_unitaires + part_recursives:
+                droite = nt + suite(rng.randint(1, max(1, longueur_droite - 1)))
+            else:
+                droite = suite(rng.randint(1, longueur_droite))
+            droites[droite] = None
+        droites[rng.choice(alphabet)] = None
+        if i + 1 < nb_non_terminaux:
+            droites[rng.choice(alphabet) + non_terminaux[i + 1]] = None
+        lignes.append(f"{nt} -> {' | '.join(droites)}\n")
+    return "".join(lignes)
+
+# Résultats de référence (graine 0, cas et longueurs par défaut), comparés à chaque exécution
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_benchmark.json")
+
+# Cas mesurés par défaut : nom -> paramètres de grammaire_synthetique
+CAS = {
+    "petite": dict(nb_non_terminaux=4, productions=3, longueur_droite=3, taille_alphabet=2),
+    "propre": dict(nb_non_terminaux=6, productions=3, longueur_droite=3, part_annulables=0,
+                   part_unitaires=0, part_recursives=0),
+    "moyenne": dict(nb_non_terminaux=8, productions=4, longueur_droite=4, taille_alphabet=3),
+    "annulables": dict(nb_non_terminaux=6, productions=3, longueur_droite=3, part_annulables=0.4),
+    "unitaires": dict(nb_non_terminaux=6, productions=3, longueur_droite=3, part_unitaires=0.4),
+    "recursives": dict(nb_non_terminaux=6, productions=3, longueur_droite=3, part_recursives=0.4),
+    "grande": dict(nb_non_terminaux=12, productions=4, longueur_droite=4, taille_alphabet=4),
+}
+
+##############################
+# Mesures
+##############################
+def _executer(operation, fichier, longueur, observateur=None):
+    """Exécute une opération ; renvoie la taille du résultat (règles ou mots)."""
+    if operation == "generer_mots":
+        return len(Generateur(fichier, longueur).generer_mots())
+    grammaire = Grammaire()
+    grammaire.lire(fichier)
+    grammaire.observateur = observateur
+    if operation == "chomsky":
+        grammaire.chomsky()
+    elif operation == "greibach":
+        grammaire.greibach()
+    else:
+        grammaire.greibach_polynomiale()
+    return grammaire.nombre_regles()
+
+def _mesurer(operation, fichier, longueur, repetitions, memoire, resultats):
+    """
+    Corps du processus de mesure : meilleur temps sur les répétitions, puis
+    une exécution observée pour le détail des passes (l'observateur compte
+    règles et symboles à chaque passe, il fausserait le temps total) et une
+    exécution sous tracemalloc pour le pic mémoire.
+    """
+    try:
+        meilleur = None
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            taille = _executer(operation, fichier, longueur)
+            duree = time.perf_counter() - debut
+            if meilleur is None or duree < meilleur:
+                meilleur = duree
+        mesure = {"temps_s": meilleur, "passes": [], "taille": taille, "memoire_max_o": None}
+        if operation != "generer_mots":
+            profil = ProfilPasses()
+            _executer(operation, fichier, longueur, profil)
+            mesure["passes"] = profil.passes
+        if memoire:
+            tracemalloc.start()
+            _executer(operation, fichier, longueur)
+            mesure["memoire_max_o"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        resultats.put(mesure)
+    except Exception as e:
+        resultats.put({"erreur": f"{type(e).__name__}: {e}"})
+
+def mesurer(operation, fichier, longueur=None, repetitions=3, memoire=True, delai=10):
+    """
+    Mesure une opération dans un processus à part, arrêté au bout de `delai`
+    secondes (l'algorithme de Greibach classique ne termine pas sur toutes
+    les grammaires). Le statut est "ok", "délai dépassé" ou l'erreur levée.
+    """
+    resultats = multiprocessing.Queue()
+    processus = multiprocessing.Process(target=_mesurer,
+                                        args=(operation, fichier, longueur, repetitions, memoire, resultats))
+    processus.start()
+    try:
+        mesure = resultats.get(timeout=delai)
+    except Exception:
+        mesure = {"erreur": "délai dépassé"}
+    if processus.is_alive():
+        processus.terminate()
+    processus.join()
+    mesure["statut"] = mesure.pop("erreur", "ok")
+    return mesure
+
+def lancer(cas, longueurs, graine=0, repetitions=3, memoire=True, delai=10, repertoire=None):
+    """Mesure chaque cas ; renvoie la liste des résultats (un par cas, opération et longueur)."""
+    resultats = []
+    with tempfile.TemporaryDirectory() as temporaire:
+        for nom in cas:
+            # graine propre à chaque cas, quel que soit le sous-ensemble de cas choisi
+            texte = grammaire_synthetique(graine=graine + list(CAS).index(nom), **CAS[nom])
+            fichier = os.path.join(repertoire or temporaire, f"{nom}.general")
+            with open(fichier, "w") as f:
+                f.write(texte)
+            taches = [(op, None) for op in ["chomsky", "greibach", "greibach_polynomiale"]]
+            taches += [("generer_mots", longueur) for longueur in longueurs]
+            for operation, longueur in taches:
+                mesure = mesurer(operation, fichier, longueur, repetitions, memoire, delai)
+                resultat = {"cas": nom, "operation": operation, "longueur": longueur}
+                resultat.update(mesure)
+                resultats.append(resultat)
+                print(_ligne(resultat), file=sys.stderr)
+    return resultats
+
+##############################
+# Comparaison à une référence
+##############################
+def _cle(resultat):
+    return (resultat["cas"], resultat["operation"], resultat["longueur"])
+
+def _ligne(resultat, reference=None):
+    """Une ligne de rapport lisible pour un résultat (et sa référence éventuelle)."""
+    nom = f"{resultat['cas']:<11} {resultat['operation']:<21} {resultat['longueur'] or '':>3}"
+    if resultat["statut"] != "ok":
+        return f"{nom}  {resultat['statut']}"
+    memoire = resultat["memoire_max_o"]
+    ligne = (f"{nom}  {resultat['temps_s'] * 1000:10.2f} ms  "
+             f"{'' if memoire is None else f'{memoire / 1024:10.1f} Kio'}  {resultat['taille']:>8}")
+    if reference is not None and reference.get("statut") == "ok":
+        ligne += f"  x{resultat['temps_s'] / max(reference['temps_s'], 1e-9):.2f}"
+    return ligne
+
+def comparer(resultats, reference, tolerance=0.25, ecart_min=0.005):
+    """
+    Compare aux résultats de référence. Renvoie les régressions : opération
+    plus lente de plus de `tolerance` (et d'au moins ecart_min secondes, pour
+    ignorer le bruit des mesures très courtes), taille de résultat
+    différente, ou opération qui n'aboutit plus.
+    """
+    references = {_cle(r): r for r in reference["resultats"]}
+    regressions = []
+    for resultat in resultats:
+        ref = references.get(_cle(resultat))
+        print(_ligne(resultat, ref))
+        if ref is None or ref["statut"] != "ok":
+            continue
+        if resultat["statut"] != "ok":
+            regressions.append(f"{_ligne(resultat)} (ok dans la référence)")
+        elif resultat["taille"] != ref["taille"]:
+            regressions.append(f"{_ligne(resultat)} (taille {ref['taille']} dans la référence)")
+        elif (resultat["temps_s"] > ref["temps_s"] * (1 + tolerance)
+              and resultat["temps_s"] - ref["temps_s"] > ecart_min):
+            regressions.append(f"{_ligne(resultat, ref)} (plus lent)")
+    return regressions
+
+##############################
+# MAIN
+##############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesures de Grammaire et Generateur sur des grammaires synthétiques.")
+    parser.add_argument("--cas", nargs="+", choices=list(CAS), default=list(CAS),
+                        help="cas à mesurer (tous par défaut)")
+    parser.add_argument("--longueurs", nargs="+", type=int, default=[4, 6, 8],
+                        help="longueurs maximales passées au générateur de mots")
+    parser.add_argument("--graine", type=int, default=0, help="graine des grammaires synthétiques")
+    parser.add_argument("--repetitions", type=int, default=3, help="on garde le meilleur temps")
+    parser.add_argument("--delai", type=float, default=10, help="secondes avant d'abandonner une mesure")
+    parser.add_argument("--sans-memoire", action="store_true", help="ne mesure pas le pic mémoire")
+    parser.add_argument("--sortie", default="resultats_benchmark.json", help="fichier JSON des résultats")
+    parser.add_argument("--reference", default=REFERENCE,
+                        help="résultats JSON d'une exécution précédente à comparer (par défaut reference_benchmark.json)")
+    parser.add_argument("--sans-reference", action="store_true", help="ne compare à aucune référence")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="ralentissement accepté par rapport à la référence (0.25 = 25 %%)")
+    parser.add_argument("--ecart-min", type=float, default=5,
+                        help="ralentissement minimal en ms pour signaler une régression")
+    parser.add_argument("--grammaires", help="répertoire où garder les grammaires synthétiques")
+    args = parser.parse_args()
+
+    if args.grammaires:
+        os.makedirs(args.grammaires, exist_ok=True)
+    # lue avant d'écrire les résultats : --sortie peut la remplacer
+    reference = None
+    if not args.sans_reference:
+        if os.path.exists(args.reference) or args.reference != REFERENCE:
+            with open(args.reference) as f:
+                reference = json.load(f)
+        else:
+            print(f"Pas de référence {args.reference} : aucune comparaison", file=sys.stderr)
+    resultats = lancer(args.cas, args.longueurs, args.graine, args.repetitions,
+                       not args.sans_memoire, args.delai, args.grammaires)
+    with open(args.sortie, "w") as f:
+        json.dump({"graine": args.graine, "python": platform.python_version(), "resultats": resultats},
+                  f, indent=1, ensure_ascii=False)
+    print(f"Résultats dans {args.sortie}", file=sys.stderr)
+
+    if reference is not None and os.path.abspath(args.sortie) != os.path.abspath(args.reference):
+        if reference.get("graine") != args.graine:
+            print("Attention : la référence a été mesurée avec une autre graine", file=sys.stderr)
+        regressions = comparer(resultats, reference, args.tolerance, args.ecart_min / 1000)
+        for regression in regressions:
+            print(f"RÉGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,184 @@
+import os
+import sys
+import hashlib
+import tempfile
+import zlib
+from collections import OrderedDict
+
+##############################
+# Cache des conversions
+##############################
+class CacheConversions:
+    """
+    Cache sur disque des grammaires converties, adressé par contenu : la clé
+    est l'empreinte (sha256) de la grammaire d'entrée mise sous forme
+    canonique, de l'étape de conversion et de la version du convertisseur.
+    Chaque entrée est un fichier compressé (zlib) nommé par sa clé. Quand la
+    taille totale dépasse taille_max, les entrées les moins récemment lues
+    (date de modification, remise à jour à chaque succès) sont supprimées.
+    Plusieurs processus peuvent partager le même répertoire : les écritures
+    sont atomiques et une entrée disparue est un simple échec.
+    """
+    def __init__(self, repertoire, taille_max=32 * 1024 * 1024, version=""):
+        self.repertoire = repertoire
+        self.taille_max = taille_max
+        self.version = version
+        self.succes = 0
+        self.echecs = 0
+        self._taille = None  # taille totale estimée, calculée au premier ajout
+
+    def cle(self, etape, *parties):
+        """Empreinte de l'étape et des textes qui décrivent l'entrée."""
+        h = hashlib.sha256()
+        for partie in (self.version, etape) + parties:
+            h.update(partie.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.repertoire, cle + ".z")
+
+    def lire(self, cle):
+        """Texte associé à la clé, ou None s'il n'est pas en cache."""
+        chemin = self._chemin(cle)
+        try:
+            with open(chemin, "rb") as f:
+                texte = zlib.decompress(f.read()).decode()
+            os.utime(chemin)
+        except (OSError, zlib.error):
+            self.echecs += 1
+            return None
+        self.succes += 1
+        return texte
+
+    def ecrire(self, cle, texte):
+        """Ajoute une entrée puis libère de la place si besoin."""
+        os.makedirs(self.repertoire, exist_ok=True)
+        donnees = zlib.compress(texte.encode())
+        fd, temporaire = tempfile.mkstemp(dir=self.repertoire, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(donnees)
+        os.replace(temporaire, self._chemin(cle))
+        if self._taille is None:
+            self._taille = sum(taille for _, taille, _ in self._entrees())
+        else:
+            self._taille += len(donnees)
+        if self._taille > self.taille_max:
+            self._evincer()
+
+    def _entrees(self):
+        """(chemin, taille, date de dernière lecture) de chaque entrée."""
+        entrees = []
+        try:
+            noms = os.listdir(self.repertoire)
+        except FileNotFoundError:
+            return entrees
+        for nom in noms:
+            if not nom.endswith(".z"):
+                continue
+            chemin = os.path.join(self.repertoire, nom)
+            try:
+                infos = os.stat(chemin)
+            except FileNotFoundError:
+                continue
+            entrees.append((chemin, infos.st_size, infos.st_mtime))
+        return entrees
+
+    def _evincer(self):
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous taille_max."""
+        entrees = sorted(self._entrees(), key=lambda entree: entree[2])
+        total = sum(taille for _, taille, _ in entrees)
+        for chemin, taille, _ in entrees:
+            if total <= self.taille_max:
+                break
+            try:
+                os.remove(chemin)
+            except FileNotFoundError:
+                pass
+            total -= taille
+        self._taille = total
+
+    def vider(self):
+        """Supprime toutes les entrées. Renvoie leur nombre."""
+        entrees = self._entrees()
+        for chemin, _, _ in entrees:
+            try:
+                os.remove(chemin)
+            except FileNotFoundError:
+                pass
+        self._taille = 0
+        return len(entrees)
+
+    def bilan(self):
+        return f"cache : {self.succes} succès, {self.echecs} échecs"
+
+
+##############################
+# Cache en mémoire
+##############################
+class CacheMemoire:
+    """
+    Cache LRU en mémoire avec un budget en octets. La taille de chaque
+    valeur est donnée à l'ajout (voir taille_objet) ; quand le total dépasse
+    le budget, les valeurs les moins récemment lues sont oubliées. Une valeur
+    plus grosse que le budget n'est pas gardée.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.taille = 0
+        self.succes = 0
+        self.echecs = 0
+        self._entrees = OrderedDict()  # clé -> (valeur, taille), la plus ancienne en tête
+
+    def lire(self, cle):
+        """Valeur associée à la clé, ou None."""
+        entree = self._entrees.get(cle)
+        if entree is None:
+            self.echecs += 1
+            return None
+        self._entrees.move_to_end(cle)
+        self.succes += 1
+        return entree[0]
+
+    def ecrire(self, cle, valeur, taille):
+        ancienne = self._entrees.pop(cle, None)
+        if ancienne is not None:
+            self.taille -= ancienne[1]
+        if taille > self.budget:
+            return
+        self._entrees[cle] = (valeur, taille)
+        self.taille += taille
+        while self.taille > self.budget:
+            _, (_, taille_oubliee) = self._entrees.popitem(last=False)
+            self.taille -= taille_oubliee
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def bilan(self):
+        return {"entrees": len(self), "octets": self.taille, "budget": self.budget,
+                "succes": self.succes, "echecs": self.echecs}
+
+def taille_objet(objet):
+    """
+    Estimation de la mémoire occupée par un objet et tout ce qu'il contient
+    (conteneurs usuels et attributs des instances), chaque objet n'étant
+    compté qu'une fois.
+    """
+    vus = set()
+    pile = [objet]
+    total = 0
+    while pile:
+        o = pile.pop()
+        if id(o) in vus:
+            continue
+        vus.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            pile.extend(o.keys())
+            pile.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            pile.extend(o)
+        elif hasattr(o, "__dict__") and not isinstance(o, type):
+            pile.append(vars(o))
+    return total
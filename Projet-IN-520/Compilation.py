@@ -0,0 +1,142 @@
+import re
+import sys
+import struct
+from array import array
+
+##############################
+# Grammaire compilée
+##############################
+# Un symbole : majuscule suivie de chiffres (non-terminal), E (epsilon) ou minuscule
+MOTIF_SYMBOLE = re.compile(r'(?:[A-Z]\d*|E|[a-z])')
+
+# En-tête du format binaire : magique (avec numéro de version), nombre de
+# symboles, axiome, taille en octets des noms, nombre d'entiers du corps et
+# leur taille en octets
+MAGIQUE = b"GRAMC\x00\x01\x00"
+EN_TETE = struct.Struct("<8sIIIIB")
+TYPES_ENTIERS = {1: "B", 2: "H", 4: "I"}
+# axiome d'une grammaire vide (aucune règle, langage vide)
+SANS_AXIOME = 0xFFFFFFFF
+
+class GrammaireCompilee:
+    """
+    Grammaire dont les parties droites sont découpées une fois pour toutes en
+    tuples d'identifiants de symboles (() = epsilon).
+      - noms[i] : nom du symbole i, ids : nom -> identifiant
+      - terminal[i] : 1 si le symbole i est un terminal
+      - regles : identifiant d'un non-terminal -> liste de ses parties droites,
+        dans l'ordre du fichier (l'axiome en premier)
+    Format binaire (petit-boutiste) : EN_TETE, les noms séparés par "\\n" en
+    UTF-8, un octet terminal par symbole, puis des entiers non signés de 1,
+    2 ou 4 octets (les plus petits qui suffisent) : pour chaque non-terminal,
+    son identifiant, son nombre de parties droites et chacune d'elles
+    précédée de sa longueur.
+    """
+    def __init__(self, noms, terminal, axiome, regles):
+        self.noms = noms
+        self.ids = {nom: i for i, nom in enumerate(noms)}
+        self.terminal = terminal
+        self.axiome = axiome
+        self.regles = regles
+
+    @classmethod
+    def depuis_texte(cls, texte):
+        """
+        Découpe le texte d'une grammaire (format .general, .chomsky, .greibach).
+        La première règle donne l'axiome ; une ligne répétée remplace la précédente.
+        """
+        noms, ids, terminal, regles = [], {}, bytearray(), {}
+
+        def symbole(nom):
+            i = ids.get(nom)
+            if i is None:
+                i = ids[nom] = len(noms)
+                noms.append(nom)
+                terminal.append(nom.islower())
+            return i
+
+        axiome = None
+        for ligne in texte.splitlines():
+            if "->" not in ligne:
+                continue
+            gauche, droite = ligne.split("->")
+            gauche = symbole(gauche.strip())
+            if axiome is None:
+                axiome = gauche
+            regles[gauche] = [tuple(symbole(s) for s in MOTIF_SYMBOLE.findall(seq) if s != "E")
+                              for seq in droite.split("|")]
+        return cls(noms, terminal, axiome, regles)
+
+    @classmethod
+    def depuis_grammaire(cls, grammaire):
+        """
+        Reprend la table des symboles et les règles d'une Grammaire (l'axiome
+        en premier), sans les non-terminaux qui n'ont aucune règle. Un axiome
+        sans règle donne la grammaire vide.
+        """
+        symboles = grammaire.symboles
+        if not grammaire.regles.get(grammaire.axiome):
+            return cls(list(symboles.noms), bytearray(symboles.terminal), None, {})
+        ordre = sorted(grammaire.regles, key=lambda nt: nt != grammaire.axiome)
+        regles = {nt: list(grammaire.regles[nt]) for nt in ordre if grammaire.regles[nt]}
+        return cls(list(symboles.noms), bytearray(symboles.terminal), grammaire.axiome, regles)
+
+    @classmethod
+    def charger(cls, fichier):
+        """Lit un fichier compilé, ou à défaut un fichier texte à découper."""
+        with open(fichier, "rb") as f:
+            donnees = f.read()
+        if donnees.startswith(MAGIQUE[:6]):
+            return cls.depuis_octets(donnees)
+        return cls.depuis_texte(donnees.decode())
+
+    @classmethod
+    def depuis_octets(cls, donnees):
+        magique, nb_symboles, axiome, taille_noms, nb_entiers, largeur = EN_TETE.unpack_from(donnees)
+        if magique != MAGIQUE or largeur not in TYPES_ENTIERS:
+            raise ValueError("Version du format de grammaire compilée non reconnue")
+        debut = EN_TETE.size
+        noms = donnees[debut:debut + taille_noms].decode().split("\n") if nb_symboles else []
+        debut += taille_noms
+        terminal = bytearray(donnees[debut:debut + nb_symboles])
+        debut += nb_symboles
+        corps = array(TYPES_ENTIERS[largeur])
+        corps.frombytes(donnees[debut:debut + largeur * nb_entiers])
+        if sys.byteorder == "big":
+            corps.byteswap()
+        corps = corps.tolist()
+        regles = {}
+        i = 0
+        while i < len(corps):
+            nt, nb = corps[i], corps[i + 1]
+            i += 2
+            droites = []
+            for _ in range(nb):
+                longueur = corps[i]
+                droites.append(tuple(corps[i + 1:i + 1 + longueur]))
+                i += 1 + longueur
+            regles[nt] = droites
+        return cls(noms, terminal, None if axiome == SANS_AXIOME else axiome, regles)
+
+    def octets(self):
+        """La grammaire au format binaire."""
+        entiers = []
+        for nt, droites in self.regles.items():
+            entiers.append(nt)
+            entiers.append(len(droites))
+            for droite in droites:
+                entiers.append(len(droite))
+                entiers.extend(droite)
+        plus_grand = max(entiers, default=0)
+        largeur = 1 if plus_grand < 1 << 8 else 2 if plus_grand < 1 << 16 else 4
+        corps = array(TYPES_ENTIERS[largeur], entiers)
+        if sys.byteorder == "big":
+            corps.byteswap()
+        noms = "\n".join(self.noms).encode()
+        axiome = SANS_AXIOME if self.axiome is None else self.axiome
+        return (EN_TETE.pack(MAGIQUE, len(self.noms), axiome, len(noms), len(corps), largeur)
+                + noms + bytes(self.terminal) + corps.tobytes())
+
+    def ecrire(self, fichier):
+        with open(fichier, "wb") as f:
+            f.write(self.octets())
@@ -0,0 +1,118 @@
+import sys
+import random
+import argparse
+import itertools
+
+from Grammaire import Grammaire
+from Generateur import Generateur
+from Reconnaisseur import ReconnaisseurCYK, ReconnaisseurEarley
+from Compteur import Compteur
+
+##############################
+# Équivalence bornée
+##############################
+def premier_contre_exemple(fichiers, longueur_max):
+    """
+    Parcourt en même temps les mots de longueur <= longueur_max de chaque
+    grammaire, tous dans l'ordre longueur puis lexicographique (chaque
+    longueur n'est calculée que si les précédentes coïncident). Tant que
+    les têtes des énumérations sont égales on avance partout ; sinon la
+    plus petite tête est un mot engendré par certaines grammaires
+    seulement, et on s'arrête là.
+    Renvoie (mot, fichiers qui l'engendrent, nombre de mots communs vus),
+    avec mot = None si les langages coïncident jusqu'à cette longueur.
+    """
+    flux = [Generateur(fichier, longueur_max).iterer_mots(tables=True) for fichier in fichiers]
+    tetes = [next(f, None) for f in flux]
+    communs = 0
+    while True:
+        presents = [mot for mot in tetes if mot is not None]
+        if not presents:
+            return None, list(fichiers), communs
+        plus_petit = min(presents, key=lambda mot: (len(mot), mot))
+        engendrent = [i for i, mot in enumerate(tetes) if mot == plus_petit]
+        if len(engendrent) < len(flux):
+            return plus_petit, [fichiers[i] for i in engendrent], communs
+        communs += 1
+        tetes = [next(f, None) for f in flux]
+
+def rapport(fichiers, longueur_max, mot, engendrent, communs):
+    """Message lisible sur le résultat de premier_contre_exemple."""
+    if mot is None:
+        return f"Langages identiques jusqu'à la longueur {longueur_max} ({communs} mots)"
+    autres = [fichier for fichier in fichiers if fichier not in engendrent]
+    return (f"Contre-exemple : {mot or 'E'} est engendré par {', '.join(engendrent)} "
+            f"mais pas par {', '.join(autres)}")
+
+##############################
+# Recoupement des moteurs
+##############################
+def recouper_moteurs(fichier, longueur_max, rng=random):
+    """
+    Recoupe, sur tous les mots de longueur <= longueur_max de l'alphabet
+    d'un .general, les moteurs qui ne passent pas par Generateur : Earley
+    sur la grammaire lue, CYK sur sa forme de Chomsky, Earley sur sa forme
+    de Greibach par coin gauche, et le Compteur (une longueur a des
+    dérivations si et seulement si elle a des mots, au moins autant que de
+    mots, et un mot tiré est engendré). La référence est l'énumération
+    du Generateur.
+    Renvoie la liste des désaccords (vide si tout coïncide).
+    """
+    mots = set(Generateur(fichier, longueur_max).iterer_mots(tables=True))
+    generale = Grammaire()
+    generale.lire(fichier)
+    chomsky = Grammaire()
+    chomsky.lire(fichier)
+    chomsky.chomsky()
+    greibach = Grammaire()
+    greibach.lire(fichier)
+    greibach.greibach_polynomiale()
+    moteurs = [("Earley", ReconnaisseurEarley(generale)),
+               ("CYK", ReconnaisseurCYK(chomsky)),
+               ("Greibach coin gauche", ReconnaisseurEarley(greibach))]
+    alphabet = [nom for i, nom in enumerate(generale.symboles.noms) if generale.symboles.terminal[i]]
+    compteur = Compteur(chomsky)
+    desaccords = []
+    for n in range(longueur_max + 1):
+        # les mots énumérés en font partie, même s'ils sortaient de l'alphabet
+        candidats = {"".join(lettres) for lettres in itertools.product(alphabet, repeat=n)}
+        candidats.update(mot for mot in mots if len(mot) == n)
+        candidats = sorted(candidats)
+        for nom, reconnaisseur in moteurs:
+            for mot in candidats:
+                if reconnaisseur.appartient(mot) != (mot in mots):
+                    desaccords.append(f"{fichier} : {nom} {'rejette' if mot in mots else 'accepte'} {mot or 'E'}")
+        attendus = sum(1 for mot in mots if len(mot) == n)
+        derivations = compteur.nombre(n)
+        if (derivations > 0) != (attendus > 0) or derivations < attendus:
+            desaccords.append(f"{fichier} : Compteur donne {derivations} dérivations "
+                              f"de longueur {n} pour {attendus} mots")
+        elif attendus:
+            mot = compteur.tirer(n, rng)
+            if mot not in mots:
+                desaccords.append(f"{fichier} : Compteur tire {mot or 'E'}, qui n'est pas engendré")
+    return desaccords
+
+##############################
+# MAIN
+##############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare les langages de plusieurs grammaires jusqu'à une longueur donnée.")
+    parser.add_argument("longueur_max", type=int, help="longueur maximale des mots comparés")
+    parser.add_argument("fichiers", nargs="+", help="grammaires (.general, .chomsky, .greibach)")
+    parser.add_argument("--moteurs", action="store_true",
+                        help="recoupe plutôt, pour chaque .general, l'énumération avec Earley, CYK, "
+                             "la forme de Greibach par coin gauche et le Compteur")
+    args = parser.parse_args()
+
+    if args.moteurs:
+        desaccords = [d for fichier in args.fichiers for d in recouper_moteurs(fichier, args.longueur_max)]
+        for desaccord in desaccords:
+            print(desaccord)
+        if not desaccords:
+            print(f"Moteurs d'accord jusqu'à la longueur {args.longueur_max} sur {len(args.fichiers)} grammaire(s)")
+        sys.exit(0 if not desaccords else 1)
+
+    mot, engendrent, communs = premier_contre_exemple(args.fichiers, args.longueur_max)
+    print(rapport(args.fichiers, args.longueur_max, mot, engendrent, communs))
+    sys.exit(0 if mot is None else 1)
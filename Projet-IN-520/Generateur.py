@@ -1,84 +1,530 @@
+import os
 import sys
-import re
+import time
+import argparse
+import heapq
+import queue
+import random
+import multiprocessing
+import zlib
+
+from Grammaire import Grammaire
+from Compteur import Compteur
+from Compilation import GrammaireCompilee
 
 class Generateur:
     def __init__(self, fichier, longueur_max):
         self.regles = {}
         self.axiome = None
         self.longueur_max = longueur_max
+        self.nb_elagues = 0  # nombre de formes (en mode tables : d'expansions) abandonnées car trop longues
+        self.suivi = None  # voir SuiviRecherche : mesures et budget mémoire de l'énumération
+        self.empreintes = False  # formes visitées gardées par leur seule empreinte (repli mémoire)
+        # tables du mode tables (voir _iterer_tables), vidées à la fin de chaque énumération
+        self.tables = self._propres = self._suites = self._autres = self._clotures = None
+        self.nb_tables = 0  # tables (non-terminal, longueur) calculées par la dernière énumération
+        self.mots_en_tables = 0
         self.lire_grammaire(fichier)
+        self.calculer_longueurs_min()
 
     def lire_grammaire(self, fichier):
-        """Lit la grammaire à partir d'un fichier."""
-        with open(fichier, "r") as f:
-            for ligne in f:
-                ligne = ligne.strip()
-                if "->" in ligne:
-                    gauche, droite = ligne.split("->")
-                    gauche = gauche.strip()
-                    sequences = [seq.strip() for seq in droite.split("|")]
-                    if self.axiome is None:
-                        self.axiome = gauche
-                    self.regles[gauche] = sequences
+        """
+        Lit la grammaire à partir d'un fichier texte ou compilé (voir
+        Compilation.py ; un fichier compilé évite tout découpage du texte),
+        ou la prend telle quelle si c'est déjà une GrammaireCompilee.
+        self.regles associe à chaque non-terminal ses parties droites déjà
+        découpées en symboles, sans E. Chaque nom de symbole est une seule
+        chaîne partagée par toutes les règles. Un non-terminal sans règle y
+        figure aussi (sans partie droite) : il n'engendre rien, au lieu d'être
+        pris pour une lettre.
+        """
+        if isinstance(fichier, GrammaireCompilee):
+            compilee = fichier
+        else:
+            compilee = GrammaireCompilee.charger(fichier)
+        noms = compilee.noms
+        self.axiome = None if compilee.axiome is None else noms[compilee.axiome]
+        self.regles = {noms[nt]: [tuple(noms[s] for s in droite) for droite in droites]
+                       for nt, droites in compilee.regles.items()}
+        for i, nom in enumerate(noms):
+            if not compilee.terminal[i] and nom not in self.regles:
+                self.regles[nom] = []
         #print(f"Grammaire chargée : {self.regles}")  # Affiche la grammaire pour vérifier
 
-    def analyser_sequence(self, sequence):
+    def calculer_longueurs_min(self):
+        """
+        Calcule la longueur minimale d'un mot terminal dérivable depuis chaque
+        non-terminal (point fixe). Les non-terminaux improductifs restent à
+        l'infini et sont rangés dans self.improductifs, les annulables (longueur
+        minimale 0) dans self.annulables.
+        Prépare ensuite self.expansions (voir _preparer_expansions).
+        """
+        self.longueurs_min = {nt: float("inf") for nt in self.regles}
+        sequences = self.regles
+        changement = True
+        while changement:
+            changement = False
+            for nt, seqs in sequences.items():
+                for seq in seqs:
+                    longueur = self.longueur_min_sequence(seq)
+                    if longueur < self.longueurs_min[nt]:
+                        self.longueurs_min[nt] = longueur
+                        changement = True
+        self.improductifs = {nt for nt, l in self.longueurs_min.items() if l == float("inf")}
+        self.annulables = {nt for nt, l in self.longueurs_min.items() if l == 0}
+        self.accepte_vide = self.axiome in self.annulables
+        self._preparer_expansions()
+
+    def _preparer_expansions(self):
+        """
+        self.expansions : pour chaque non-terminal, ses expansions découpées
+        une seule fois, sans E, sans symbole improductif, et avec les
+        variantes où des annulables sont effacés. La recherche ne dérive
+        ainsi jamais le mot vide, chaque symbole d'une forme produit au moins
+        une lettre et la longueur des formes est bornée. Seules les variantes
+        dont la borne ne dépasse pas longueur_max sont gardées : une règle à
+        k annulables n'en donne plus 2^k quand les mots cherchés sont courts.
+        """
+        self.longueur_expansions = self.longueur_max
+        self.expansions = {}
+        for nt, seqs in self.regles.items():
+            variantes = {}
+            for seq in seqs:
+                if any(symb in self.improductifs for symb in seq):
+                    continue
+                for variante, borne in self._variantes_sans_annulables(seq, self.longueur_max):
+                    # on ignore le mot vide et la règle triviale nt -> nt
+                    if variante and variante != (nt,):
+                        variantes[variante] = borne
+            self.expansions[nt] = [(list(v), borne) for v, borne in variantes.items()]
+
+    def _variantes_sans_annulables(self, seq, borne_max):
+        """
+        Les séquences obtenues en effaçant une partie des annulables, avec
+        leur borne (voir borne_sequence), sauf celles dont la borne dépasse
+        borne_max : une variante est abandonnée dès que son début la dépasse.
+        Les débuts identiques (A A A en effaçant l'un ou l'autre des A) ne
+        sont gardés qu'une fois.
+        """
+        variantes = {(): 0}
+        for symbole in seq:
+            poids = max(self.longueurs_min.get(symbole, 1), 1)
+            prolongees = {v + (symbole,): borne + poids for v, borne in variantes.items() if borne + poids <= borne_max}
+            if symbole in self.annulables:
+                variantes.update(prolongees)
+            else:
+                variantes = prolongees
+        return variantes.items()
+
+    def changer_longueur(self, longueur_max):
+        """
+        Change la longueur maximale des mots cherchés. Les expansions ne sont
+        refaites que si elle dépasse celle pour laquelle elles ont été
+        préparées (les variantes en trop sont élaguées par la recherche).
+        Renvoie True si elles ont été refaites.
+        """
+        self.longueur_max = longueur_max
+        if longueur_max <= self.longueur_expansions:
+            return False
+        self._preparer_expansions()
+        return True
+
+    def longueur_min_sequence(self, sequence):
+        """Nombre de terminaux + somme des longueurs minimales des non-terminaux."""
+        longueur = 0
+        for symbole in sequence:
+            if symbole in self.longueurs_min:
+                longueur += self.longueurs_min[symbole]
+            else:
+                longueur += 1
+        return longueur
+
+    def borne_sequence(self, sequence):
         """
-        Analyse une séquence pour séparer les symboles non-terminaux (majuscules) 
-        des terminaux (minuscules ou chaînes définies dans les règles).
+        Longueur minimale d'un mot dérivable depuis une forme sans effacement :
+        chaque symbole compte pour au moins une lettre.
         """
-        pattern = re.compile(r'(?:[A-Z]\d*|E|[a-z])')
-        return pattern.findall(sequence)
+        return sum(max(self.longueurs_min.get(symbole, 1), 1) for symbole in sequence)
 
     def generer_mots(self):
         """Génère tous les mots de longueur inférieure ou égale à longueur_max."""
+        return sorted(self.iterer_mots(tables=True))  # Tri lexicographique des mots
+
+    def iterer_mots(self, ordonne=True, tables=False):
+        """
+        Produit les mots de longueur <= longueur_max au fur et à mesure qu'ils
+        sont trouvés, sans doublon.
+          - ordonne=True : par longueur puis ordre lexicographique, via une
+            recherche guidée par la longueur (la mémoire reste bornée par la
+            frontière de recherche).
+          - ordonne=False : dans l'ordre de la recherche en profondeur.
+          - tables=True : par longueur puis ordre lexicographique, à partir des
+            tables des mots de chaque non-terminal (voir _iterer_tables).
+        """
+        self.nb_elagues = 0
+        if tables:
+            return self._iterer_tables()
+        if ordonne:
+            return self._iterer_ordonne()
+        return self._iterer_profondeur()
+
+    def _iterer_profondeur(self):
+        """Recherche en profondeur, chaque nouveau mot est renvoyé dès qu'il est vu."""
         mots = set()
-        pile = [[self.axiome]]  # Démarre avec l'axiome sous forme de liste contenant des symboles séparés
+        if self.accepte_vide and self.longueur_max >= 0:
+            mots.add("")
+            if self.suivi is not None:
+                self.suivi.mots += 1
+            yield ""
+        depart = [self.axiome]
+        # Pile de (forme, longueur minimale des mots qu'elle peut produire)
+        pile = [(depart, self.borne_sequence(depart))]
         visites = set()  # Ensemble des séquences déjà développées
+        for mot in self._parcourir(pile, visites):
+            if mot not in mots:
+                mots.add(mot)
+                if self.suivi is not None:
+                    self.suivi.mots += 1
+                yield mot
 
+    def _parcourir(self, pile, visites, garder=None):
+        """
+        Coeur de la recherche en profondeur : développe les formes de la pile
+        et renvoie les mots complets rencontrés (avec d'éventuels doublons).
+        garder(forme, borne), s'il est donné, décide si une nouvelle forme
+        reste dans la pile (sinon elle a été confiée ailleurs).
+        Avec un suivi, s'arrête (résultats partiels) quand le budget mémoire
+        est dépassé malgré le repli sur les empreintes.
+        """
+        suivi = self.suivi
+        compte = 0
+        empreintes = self.empreintes
         while pile:
-            courant = pile.pop()
+            courant, borne = pile.pop()
+            # Si même le plus court mot dérivable dépasse, on ne développe pas
+            if borne > self.longueur_max:
+                self.nb_elagues += 1
+                continue
             courant_tuple = tuple(courant)
-            if courant_tuple in visites:
+            cle = hash(courant_tuple) if empreintes else courant_tuple
+            if cle in visites:
                 continue
-            visites.add(courant_tuple)
+            visites.add(cle)
+            if suivi is not None:
+                compte += 1
+                if compte == suivi.PERIODE:
+                    suivi.expansions += compte
+                    compte = 0
+                    if not self._point_de_controle(visites, pile=len(pile), visites=len(visites)):
+                        return
+                    empreintes = self.empreintes
 
             #print(f"Développement : {courant}")  # Affiche l'état actuel de la chaîne en développement
 
-            # Ajouter au résultat si terminal et longueur valide
-            mot_actuel = "".join(courant)
-            if len(mot_actuel) <= self.longueur_max + 1 and all(
-                symbole not in self.regles for symbole in courant
-            ):
-                mot_sans_e = "".join(symb for symb in courant if symb != "E")
-
-                if len(mot_sans_e) <= self.longueur_max and all(
-                    # On s'assure que le symbole n'est pas un non-terminal
-                    # (i.e. n’apparaît pas comme clé de self.regles)
-                    symbole not in self.regles
-                    for symbole in courant
-                    if symbole != "E"
-                ):
-                    mots.add(mot_sans_e)
-                    #print(f"Mot valide ajouté : {mot_sans_e}")
+            i = self._premier_non_terminal(courant)
+            if i is None:
+                # Plus aucun non-terminal : la forme est un mot (borne <= longueur_max)
+                yield "".join(courant)
+                continue
+            for nouvelle_sequence, nouvelle_borne in self._developper(courant, i, borne):
+                if garder is None or garder(nouvelle_sequence, nouvelle_borne):
+                    pile.append((nouvelle_sequence, nouvelle_borne))
+        if suivi is not None:
+            suivi.expansions += compte
+
+    def iterer_mots_parallele(self, travailleurs=None, taille_lot=256):
+        """
+        Même ensemble de mots que iterer_mots(ordonne=False), calculé par
+        plusieurs processus. Chaque forme a un processus propriétaire, choisi
+        par hachage de son contenu : une forme n'est développée qu'une fois en
+        tout, par son propriétaire. Les nouvelles formes appartenant à un autre
+        processus lui sont envoyées par lots, ce qui répartit aussi le travail
+        des sous-arbres déséquilibrés.
+        Les mots sont renvoyés sans doublon dès qu'un processus les remonte.
+        Un processus qui s'arrête avant la fin (exception, mémoire épuisée,
+        signal) ne préviendra jamais les autres : RuntimeError est levée.
+        C'est la recherche en profondeur (iterer_mots(ordonne=False)) qui est
+        répartie, pas le mode tables : le mode tables séquentiel reste bien
+        plus rapide (voir le README).
+        """
+        travailleurs = travailleurs or os.cpu_count() or 1
+        self.nb_elagues = 0
+        mots = set()
+        if self.accepte_vide and self.longueur_max >= 0:
+            mots.add("")
+            if self.suivi is not None:
+                self.suivi.mots += 1
+            yield ""
+        if self.axiome not in self.expansions:
+            return  # grammaire vide : rien à répartir
+
+        contexte = multiprocessing.get_context()
+        boites = [contexte.Queue() for _ in range(travailleurs)]
+        resultats = contexte.Queue()
+        # lots envoyés et pas encore entièrement traités : 0 = recherche finie
+        en_attente = contexte.Value("q", 1)
+        depart = [self.axiome]
+        boites[_proprietaire(depart, travailleurs)].put([(depart, self.borne_sequence(depart))])
+        processus = [
+            contexte.Process(target=_travailleur,
+                             args=(self, numero, boites, resultats, en_attente, taille_lot))
+            for numero in range(travailleurs)
+        ]
+        for p in processus:
+            p.start()
+        try:
+            finis = 0
+            while finis < travailleurs:
+                for numero, p in enumerate(processus):
+                    if p.exitcode not in (None, 0):
+                        raise RuntimeError(f"le processus de recherche {numero} s'est arrêté "
+                                           f"avant la fin (code {p.exitcode})")
+                try:
+                    genre, contenu = resultats.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if genre == "fin":
+                    finis += 1
+                    self.nb_elagues += contenu
                     continue
-                
-            # Si la longueur dépasse, on ne développe pas
-            if len(mot_actuel) > self.longueur_max + 2:
-                #print(f"Longueur dépassée, chaîne ignorée : {mot_actuel}")  # Affiche si la chaîne dépasse la longueur max
+                for mot in contenu:
+                    if mot not in mots:
+                        mots.add(mot)
+                        yield mot
+        finally:
+            for p in processus:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+
+    def _iterer_ordonne(self):
+        """
+        Recherche par file de priorité sur la clé (borne, préfixe terminal).
+        Une expansion ne fait jamais diminuer cette clé et un mot complet a pour
+        clé (longueur, mot) : les mots sortent donc dans l'ordre
+        longueur-lexicographique. Deux formes identiques ont la même clé, il
+        suffit donc de dédoublonner parmi les formes de la clé courante.
+        """
+        if self.accepte_vide and self.longueur_max >= 0:
+            if self.suivi is not None:
+                self.suivi.mots += 1
+            yield ""
+        depart = [self.axiome]
+        compteur = 0  # départage les égalités sans comparer les formes
+        tas = [(self.borne_sequence(depart), "", compteur, depart)]
+        cle_courante = None
+        vues = set()  # formes déjà développées pour la clé courante
+        dernier_mot = None
+        suivi = self.suivi
+        compte = 0
+
+        while tas:
+            borne, prefixe, _, courant = heapq.heappop(tas)
+            if borne > self.longueur_max:
+                self.nb_elagues += 1
                 continue
+            if (borne, prefixe) != cle_courante:
+                cle_courante = (borne, prefixe)
+                vues = set()
+            courant_tuple = tuple(courant)
+            cle = hash(courant_tuple) if self.empreintes else courant_tuple
+            if cle in vues:
+                continue
+            vues.add(cle)
+            if suivi is not None:
+                compte += 1
+                if compte == suivi.PERIODE:
+                    suivi.expansions += compte
+                    compte = 0
+                    if not self._point_de_controle(vues, pile=len(tas), visites=len(vues)):
+                        return
+
+            i = self._premier_non_terminal(courant)
+            if i is None:
+                if prefixe != dernier_mot:
+                    dernier_mot = prefixe
+                    if suivi is not None:
+                        suivi.mots += 1
+                    yield prefixe
+                continue
+            for nouvelle_sequence, nouvelle_borne in self._developper(courant, i, borne):
+                j = self._premier_non_terminal(nouvelle_sequence, i)
+                nouveau_prefixe = "".join(nouvelle_sequence[:len(nouvelle_sequence) if j is None else j])
+                compteur += 1
+                heapq.heappush(tas, (nouvelle_borne, nouveau_prefixe, compteur, nouvelle_sequence))
+        if suivi is not None:
+            suivi.expansions += compte
+
+    def _iterer_tables(self):
+        """
+        Renvoie les mots de l'axiome longueur par longueur, triés, à partir de
+        self.tables[A][n] = ensemble des mots de longueur exactement n dérivés
+        du non-terminal A. Les tables sont remplies à la demande (seuls les
+        couples (A, n) réellement utilisés depuis l'axiome sont calculés) et
+        chacune n'est calculée qu'une fois.
+        Pour une expansion X1 X2 ... Xk, les mots de longueur n sont les
+        concaténations d'un mot de X1 de longueur l et d'un mot de X2 ... Xk de
+        longueur n - l : chaque point de coupure réutilise les tables des
+        longueurs plus petites (les expansions, sans annulables, donnent au
+        moins une lettre par symbole). Les suites X2 ... Xk sont elles aussi
+        mémorisées par longueur, ce qui revient à une forme binaire implicite.
+        Les règles unitaires A -> B se ramènent, à chaque longueur, à l'union
+        des mots des autres expansions des non-terminaux atteints par des
+        règles unitaires.
+        """
+        if self.accepte_vide and self.longueur_max >= 0:
+            if self.suivi is not None:
+                self.suivi.mots += 1
+            yield ""
+        if self.axiome not in self.expansions:
+            return
+        try:
+            unitaires = {nt: [] for nt in self.expansions}
+            self._autres = {nt: [] for nt in self.expansions}
+            for nt, expansions in self.expansions.items():
+                for expansion, borne in expansions:
+                    if len(expansion) == 1 and expansion[0] in self.expansions:
+                        unitaires[nt].append(expansion[0])
+                    else:
+                        self._autres[nt].append((borne, tuple(expansion)))
+                # par longueur minimale croissante : à la longueur n, on s'arrête à la première trop longue
+                self._autres[nt].sort(key=lambda expansion: expansion[0])
+            # clotures[A] : non-terminaux B tels que A =>* B par règles unitaires (A compris)
+            self._clotures = {}
+            for nt in self.expansions:
+                atteints = {nt}
+                pile = [nt]
+                while pile:
+                    for b in unitaires[pile.pop()]:
+                        if b not in atteints:
+                            atteints.add(b)
+                            pile.append(b)
+                self._clotures[nt] = [b for b in atteints if self._autres[b]]
+
+            self.tables = {nt: {} for nt in self.expansions}
+            self._propres = {}  # (A, n) -> mots des expansions non unitaires de A
+            self._suites = {}   # (suite, n) -> mots de la suite de symboles
+            self.nb_tables = 0
+            self.mots_en_tables = 0
+            for n in range(1, self.longueur_max + 1):
+                try:
+                    mots = sorted(self._mots(self.axiome, n))
+                except MemoireEpuisee:
+                    return  # les longueurs déjà renvoyées sont complètes
+                if self.suivi is not None:
+                    self.suivi.mots += len(mots)
+                yield from mots
+        finally:
+            # les tables ne durent que le temps de l'énumération : un Generateur
+            # gardé en cache (Service.py) garde la taille mesurée à son insertion
+            self.tables = self._propres = self._suites = self._autres = self._clotures = None
+
+    def _mots(self, nt, n):
+        """self.tables[nt][n], calculée au besoin."""
+        mots = self.tables[nt].get(n)
+        if mots is None:
+            clotures = self._clotures[nt]
+            if len(clotures) == 1:
+                mots = self._mots_propres(clotures[0], n)
+            else:
+                mots = set()
+                for b in clotures:
+                    mots |= self._mots_propres(b, n)
+            self.tables[nt][n] = mots
+            self.nb_tables += 1
+            self.mots_en_tables += len(mots)
+            if self.suivi is not None:
+                # les tables n'ont pas de forme plus compacte : au-delà du budget, on s'arrête
+                if not self._point_de_controle(None, tables=self.nb_tables, mots_en_tables=self.mots_en_tables):
+                    raise MemoireEpuisee()
+        return mots
+
+    def _mots_propres(self, nt, n):
+        """
+        Union des mots de longueur n des expansions non unitaires de nt (par
+        longueur minimale croissante). Les expansions dont le plus court mot
+        dépasse n sont comptées dans nb_elagues.
+        """
+        mots = self._propres.get((nt, n))
+        if mots is not None:
+            return mots
+        mots = set()
+        autres = self._autres[nt]
+        for i, (borne, expansion) in enumerate(autres):
+            if borne > n:
+                self.nb_elagues += len(autres) - i
+                break
+            if len(expansion) == 1:
+                if n == 1:
+                    mots.add(expansion[0])  # un terminal
+            else:
+                mots |= self._mots_suite(expansion, n, memoriser=False)
+        self._propres[(nt, n)] = mots
+        return mots
+
+    def _mots_suite(self, suite, n, memoriser=True):
+        """
+        Mots de longueur n dérivés de la suite de symboles. Les fins de suites
+        sont mémorisées ; une expansion entière ne l'est pas, ses mots vont
+        directement dans la table de son non-terminal.
+        """
+        premier = suite[0]
+        if len(suite) == 1:
+            if premier in self.tables:
+                return self._mots(premier, n)
+            return {premier} if n == 1 else set()
+        cle = (suite, n)
+        mots = self._suites.get(cle) if memoriser else None
+        if mots is not None:
+            return mots
+        reste = suite[1:]
+        mots = set()
+        for l in range(max(self.longueurs_min.get(premier, 1), 1), n - self.borne_sequence(reste) + 1):
+            debuts = self._mots(premier, l) if premier in self.tables else ({premier} if l == 1 else ())
+            if not debuts:
+                continue
+            fins = self._mots_suite(reste, n - l)
+            if fins:
+                mots.update(u + v for u in debuts for v in fins)
+        if memoriser:
+            self._suites[cle] = mots
+        return mots
 
-            # Remplacer le premier non-terminal trouvé
-            for i, symbole in enumerate(courant):
-                if symbole in self.regles:  # Si c'est un non-terminal
-                    #print(f"Développement de {symbole} à l'index {i}")  # Affiche quel non-terminal est développé
-                    for expansion in self.regles[symbole]:
-                        # Analyser la séquence pour séparer les terminaux et non-terminaux
-                        nouvelle_sequence = courant[:i] + self.analyser_sequence(expansion) + courant[i + 1:]
-                        #print(f"Nouvelle séquence générée : {''.join(nouvelle_sequence)}")  # Affiche la nouvelle séquence
-                        pile.append(nouvelle_sequence)
-                    break  # Un seul non-terminal est développé à la fois
-        return sorted(mots)  # Tri lexicographique des mots
+    def _point_de_controle(self, formes_vues, **tailles):
+        """
+        Transmet les tailles au suivi et applique sa décision. Renvoie False
+        si la recherche doit s'arrêter. Le repli remplace en place chaque forme
+        de formes_vues par son empreinte (hash du tuple, 64 bits) : bien moins de
+        mémoire, au risque négligeable qu'une collision fasse sauter une forme.
+        """
+        action = self.suivi.point(repli_possible=formes_vues is not None and not self.empreintes, **tailles)
+        if action == "empreintes":
+            # les tuples sont libérés au fur et à mesure : leur place sert aux empreintes
+            empreintes = set()
+            while formes_vues:
+                empreintes.add(hash(formes_vues.pop()))
+            formes_vues.update(empreintes)
+            self.empreintes = True
+        return action != "arret"
+
+    def _premier_non_terminal(self, forme, debut=0):
+        """Indice du premier non-terminal de la forme (None s'il n'y en a pas)."""
+        for i in range(debut, len(forme)):
+            if forme[i] in self.regles:
+                return i
+        return None
+
+    def _developper(self, courant, i, borne):
+        """Remplace le non-terminal d'indice i par chacune de ses expansions assez courtes."""
+        symbole = courant[i]
+        #print(f"Développement de {symbole} à l'index {i}")  # Affiche quel non-terminal est développé
+        reste = borne - max(self.longueurs_min[symbole], 1)
+        for expansion, longueur in self.expansions[symbole]:
+            nouvelle_borne = reste + longueur
+            if nouvelle_borne > self.longueur_max:
+                self.nb_elagues += 1
+                continue
+            yield courant[:i] + expansion + courant[i + 1:], nouvelle_borne
 
     def afficher_mots(self, mots):
         """Affiche les mots un par ligne."""
@@ -86,14 +532,218 @@ class Generateur:
             print(mot)
 
 
+##############################
+# Suivi de la recherche
+##############################
+class MemoireEpuisee(Exception):
+    """Budget mémoire dépassé pendant le calcul des tables."""
+
+def memoire_residente():
+    """Mémoire résidente du processus en octets (None si le système ne la donne pas)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class SuiviRecherche:
+    """
+    Mesures d'une énumération en cours et budget mémoire. Le générateur
+    appelle point() toutes les PERIODE expansions (ou à chaque nouvelle table
+    de mots) ; une ligne est écrite sur `flux` toutes les `intervalle`
+    secondes : durée, expansions par seconde, tailles des structures de la
+    recherche (pile, visites ou tables), mots trouvés et mémoire résidente.
+    Budget mémoire (memoire_max octets de mémoire résidente) : à la moitié,
+    point() demande le repli sur les empreintes (si repli=True et que la
+    recherche s'y prête), ce qui laisse la place à la conversion et ralentit
+    la croissance ; au-delà du budget, il demande l'arrêt. L'arrêt laisse des
+    résultats partiels et met interrompu à True.
+    """
+    PERIODE = 4096
+
+    def __init__(self, intervalle=None, memoire_max=None, repli=True, flux=None):
+        self.intervalle = intervalle
+        self.memoire_max = memoire_max
+        self.repli = repli
+        self.flux = flux or sys.stderr
+        self.debut = time.perf_counter()
+        self._derniere_ligne = self.debut
+        self.expansions = 0
+        self.mots = 0
+        self.interrompu = False
+        self.evenements = []
+
+    def point(self, repli_possible=False, **tailles):
+        """Renvoie "empreintes" (passer aux empreintes), "arret" ou None."""
+        maintenant = time.perf_counter()
+        afficher = self.intervalle is not None and maintenant - self._derniere_ligne >= self.intervalle
+        rss = memoire_residente() if afficher or self.memoire_max is not None else None
+        if afficher:
+            self._derniere_ligne = maintenant
+            self.ecrire(rss, **tailles)
+        if self.memoire_max is None or rss is None:
+            return None
+        if rss > self.memoire_max:
+            self.interrompu = True
+            self._evenement(f"budget mémoire atteint ({rss / 2**20:.1f} Mio) : arrêt, résultats partiels")
+            return "arret"
+        if repli_possible and self.repli and rss > self.memoire_max // 2:
+            self._evenement(f"moitié du budget mémoire atteinte ({rss / 2**20:.1f} Mio) : "
+                            "formes visitées remplacées par leurs empreintes")
+            return "empreintes"
+        return None
+
+    def _evenement(self, message):
+        self.evenements.append(message)
+        print(message, file=self.flux)
+
+    def ecrire(self, rss=None, **tailles):
+        duree = time.perf_counter() - self.debut
+        morceaux = [f"{duree:7.1f} s"]
+        if self.expansions:
+            morceaux.append(f"{self.expansions} expansions ({self.expansions / max(duree, 1e-9):.0f}/s)")
+        morceaux += [f"{nom.replace('_', ' ')} {taille}" for nom, taille in tailles.items()]
+        morceaux.append(f"{self.mots} mots")
+        if rss is not None:
+            morceaux.append(f"RSS {rss / 2**20:.1f} Mio")
+        print(", ".join(morceaux), file=self.flux)
+
+##############################
+# Travailleurs du mode parallèle
+##############################
+def _proprietaire(forme, n):
+    """Processus chargé d'une forme (hachage identique dans tous les processus)."""
+    return zlib.crc32("\x1f".join(forme).encode()) % n
+
+def _travailleur(generateur, numero, boites, resultats, en_attente, taille_lot):
+    """
+    Boucle d'un processus : développe les lots de formes qu'il reçoit, garde
+    les formes dont il est propriétaire et envoie les autres par lots.
+    Le processus qui fait tomber en_attente à 0 prévient tous les autres.
+    """
+    n = len(boites)
+    generateur.nb_elagues = 0
+    visites = set()
+    sortants = [[] for _ in range(n)]
+
+    def envoyer(destinataire):
+        # compté avant l'envoi : en_attente ne peut pas tomber à 0 trop tôt
+        with en_attente.get_lock():
+            en_attente.value += 1
+        boites[destinataire].put(sortants[destinataire])
+        sortants[destinataire] = []
+
+    def garder(forme, borne):
+        destinataire = _proprietaire(forme, n)
+        if destinataire == numero:
+            return True
+        sortants[destinataire].append((forme, borne))
+        if len(sortants[destinataire]) >= taille_lot:
+            envoyer(destinataire)
+        return False
+
+    while True:
+        lot = boites[numero].get()
+        if lot is None:
+            break
+        mots = []
+        for mot in generateur._parcourir(lot, visites, garder):
+            mots.append(mot)
+            if len(mots) >= taille_lot:
+                resultats.put(("mots", mots))
+                mots = []
+        if mots:
+            resultats.put(("mots", mots))
+        for destinataire in range(n):
+            if sortants[destinataire]:
+                envoyer(destinataire)
+        with en_attente.get_lock():
+            en_attente.value -= 1
+            fini = en_attente.value == 0
+        if fini:
+            for boite in boites:
+                boite.put(None)
+    resultats.put(("fin", generateur.nb_elagues))
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        #print("python Generateur.py <longueur_max> <fichier_grammaire>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Génère les mots d'une grammaire jusqu'à une longueur donnée.")
+    parser.add_argument("longueur_max", type=int)
+    parser.add_argument("fichier_grammaire")
+    parser.add_argument("--stats", action="store_true",
+                        help="affiche sur stderr le nombre de formes élaguées (en mode tables : d'expansions "
+                             "élaguées, de tables calculées et de mots qu'elles contiennent)")
+    parser.add_argument("--desordre", action="store_true",
+                        help="écrit les mots dans l'ordre où ils sont trouvés (sinon par longueur puis ordre lexicographique)")
+    parser.add_argument("--recherche", action="store_true",
+                        help="même ordre, par recherche guidée par la longueur au lieu des tables de mots "
+                             "de chaque non-terminal (mémoire bornée par la frontière de recherche, mais plus lent)")
+    parser.add_argument("--travailleurs", type=int, default=1,
+                        help="nombre de processus pour l'énumération (1 = séquentiel) ; c'est la recherche en "
+                             "profondeur de --desordre qui est répartie, bien plus lente que le mode tables par défaut")
+    parser.add_argument("--suivi", type=float, metavar="SECONDES",
+                        help="écrit sur stderr, à cet intervalle, expansions par seconde, taille de la pile et des "
+                             "formes visitées (ou des tables), mots trouvés et mémoire résidente")
+    parser.add_argument("--memoire-max", type=int, metavar="MO",
+                        help="budget de mémoire résidente : à la moitié, les formes visitées ne sont plus gardées que "
+                             "par leur empreinte ; au-delà, la recherche s'arrête (résultats partiels, code de retour 3)")
+    parser.add_argument("--sans-repli", action="store_true",
+                        help="avec --memoire-max, s'arrête dès le budget atteint, sans passer aux empreintes")
+    parser.add_argument("--compter", action="store_true",
+                        help="affiche le nombre de dérivations (arbres de la forme de Chomsky, pas de mots "
+                             "si elle est ambiguë) de chaque longueur <= longueur_max (fichier .general)")
+    parser.add_argument("--tirer", type=int, metavar="N",
+                        help="tire N mots de longueur longueur_max, uniformément parmi les dérivations "
+                             "de la forme de Chomsky, pas parmi les mots (fichier .general)")
+    parser.add_argument("--graine", type=int, help="graine du tirage aléatoire")
+    args = parser.parse_args()
 
-    longueur_max = int(sys.argv[1])
-    fichier_grammaire = sys.argv[2]
+    if args.compter or args.tirer is not None:
+        # Comptage / tirage des dérivations par programmation dynamique sur la forme de Chomsky
+        grammaire = Grammaire()
+        grammaire.lire(args.fichier_grammaire)
+        grammaire.chomsky()
+        compteur = Compteur(grammaire)
+        if args.compter:
+            for n in range(args.longueur_max + 1):
+                print(f"{n} : {compteur.nombre(n)} dérivations")
+        if args.tirer is not None:
+            rng = random.Random(args.graine)
+            for _ in range(args.tirer):
+                mot = compteur.tirer(args.longueur_max, rng)
+                if mot is None:
+                    break
+                print(mot)
+        sys.exit(0)
 
-    generateur = Generateur(fichier_grammaire, longueur_max)
-    mots = generateur.generer_mots()
-    generateur.afficher_mots(mots)
+    generateur = Generateur(args.fichier_grammaire, args.longueur_max)
+    if args.suivi is not None or args.memoire_max is not None:
+        if args.travailleurs > 1:
+            parser.error("--suivi et --memoire-max ne s'appliquent qu'à la recherche séquentielle")
+        generateur.suivi = SuiviRecherche(args.suivi, args.memoire_max and args.memoire_max * 1024 * 1024,
+                                          not args.sans_repli)
+    # Les mots sont écrits dès qu'ils sont trouvés
+    if args.travailleurs > 1:
+        mots = generateur.iterer_mots_parallele(args.travailleurs)
+        if not args.desordre:
+            # même ordre que la recherche séquentielle
+            mots = sorted(mots, key=lambda mot: (len(mot), mot))
+    else:
+        mots = generateur.iterer_mots(ordonne=not args.desordre, tables=not (args.desordre or args.recherche))
+    try:
+        generateur.afficher_mots(mots)
+    except BrokenPipeError:
+        # la commande en aval (head, ...) a fermé le tube : on s'arrête proprement
+        sys.stdout = open(os.devnull, "w")
+        sys.exit(0)
+    if args.stats:
+        if args.travailleurs == 1 and not (args.desordre or args.recherche):
+            print(f"Expansions élaguées : {generateur.nb_elagues}, tables calculées : {generateur.nb_tables} "
+                  f"({generateur.mots_en_tables} mots)", file=sys.stderr)
+        else:
+            print(f"Formes élaguées : {generateur.nb_elagues}", file=sys.stderr)
+    if generateur.suivi is not None:
+        if args.suivi is not None:
+            generateur.suivi.ecrire(memoire_residente())
+        if generateur.suivi.interrompu:
+            sys.exit(3)
@@ -1,31 +1,177 @@
+import os
 import sys
+import time
+import signal
+import hashlib
+import argparse
+import json
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from collections import defaultdict
 
+from Cache import CacheConversions
+from Compilation import GrammaireCompilee
+
 ##############################
 # Générateur de non-terminaux
 ##############################
 class GenerateurNonTerminaux:
-    """Création de non-terminaux (A0, A1, ... Z9 (en évitant E))."""
+    """Création de non-terminaux (A0, A1, ... Z9 (en évitant E), puis A10, ... Z19, A20, ... sans limite)."""
     def __init__(self):
         self.lettres = [chr(c) for c in range(ord('A'), ord('Z')+1) if chr(c) != 'E']
         self.index = 0
 
     def suivant(self):
-        if self.index >= 250:
-            raise ValueError("Trop de non-terminaux utilisés ! (max 250)")
-        lettre = self.lettres[self.index // 10]
-        digit = self.index % 10
+        bloc, reste = divmod(self.index, 250)
+        lettre = self.lettres[reste // 10]
+        numero = reste % 10 + 10 * bloc
         self.index += 1
-        return f"{lettre}{digit}"
+        return f"{lettre}{numero}"
+
+##############################
+# Table des symboles
+##############################
+class TableSymboles:
+    """
+    Internement des symboles : chaque symbole est un entier, son nom n'est
+    utilisé qu'à la lecture et à l'écriture des fichiers.
+    terminal[i] vaut 1 si le symbole i est un terminal.
+    """
+    def __init__(self):
+        self.noms = []
+        self.ids = {}
+        self.terminal = bytearray()
+        self.genNT = GenerateurNonTerminaux()
+
+    def symbole(self, nom):
+        """Identifiant du symbole de ce nom (créé au besoin, terminal si minuscule)."""
+        i = self.ids.get(nom)
+        if i is None:
+            i = self._ajouter(nom, nom.islower())
+        return i
+
+    def nouveau_non_terminal(self):
+        """Crée un non-terminal frais dont le nom n'est pas encore utilisé."""
+        nom = self.genNT.suivant()
+        while nom in self.ids:
+            nom = self.genNT.suivant()
+        return self._ajouter(nom, False)
+
+    def _ajouter(self, nom, terminal):
+        i = len(self.noms)
+        self.noms.append(nom)
+        self.ids[nom] = i
+        self.terminal.append(terminal)
+        return i
+
+    def nom(self, i):
+        return self.noms[i]
+
+    def texte(self, seq):
+        """Partie droite d'une règle sous forme de texte ("E" pour epsilon)."""
+        if not seq:
+            return "E"
+        return "".join(self.noms[s] for s in seq)
+
+##############################
+# Profilage des passes
+##############################
+class ProfilPasses:
+    """
+    Observateur des conversions : à brancher dans grammaire.observateur.
+    Les algorithmes le préviennent à la fin de chaque passe ; il note pour
+    chacune la durée, le nombre de règles, le nombre total de symboles en
+    partie droite, les non-terminaux créés, ceux évités par partage
+    (grammaire.nt_evites) et, avec memoire=True,
+    la variation et le pic de mémoire (tracemalloc, qui ralentit les passes).
+    Le premier appel ne sert que de point de départ.
+    """
+    def __init__(self, memoire=False):
+        self.memoire = memoire
+        self.passes = []
+        self._instant = None
+        self._precedent = None
+        self._trace_lancee = False
+
+    def _etat(self, grammaire):
+        symboles = sum(len(seq) for seqs in grammaire.regles.values() for seq in seqs)
+        memoire = tracemalloc.get_traced_memory()[0] if self.memoire else None
+        return len(grammaire.symboles.noms), symboles, memoire, grammaire.nt_evites
+
+    def etape(self, grammaire, message):
+        maintenant = time.perf_counter()
+        if self._instant is None:
+            if self.memoire and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._trace_lancee = True
+            self._precedent = self._etat(grammaire)
+        else:
+            nb_symboles, symboles, memoire, nt_evites = etat = self._etat(grammaire)
+            passe = {
+                "passe": message.rstrip(" :"),
+                "temps_s": maintenant - self._instant,
+                "regles": grammaire.nombre_regles(),
+                "symboles": symboles,
+                "nouveaux_nt": nb_symboles - self._precedent[0],
+                "nt_evites": nt_evites - self._precedent[3],
+            }
+            if self.memoire:
+                passe["memoire_o"] = memoire - self._precedent[2]
+                passe["pic_o"] = tracemalloc.get_traced_memory()[1] - self._precedent[2]
+            self.passes.append(passe)
+            self._precedent = etat
+        if self.memoire:
+            tracemalloc.reset_peak()
+        # le temps passé ici n'est pas compté dans la passe suivante
+        self._instant = time.perf_counter()
+
+    def terminer(self):
+        """Arrête tracemalloc s'il a été lancé par cet observateur."""
+        if self._trace_lancee:
+            tracemalloc.stop()
+            self._trace_lancee = False
+
+    def tableau(self):
+        """Les passes sous forme de tableau lisible."""
+        lignes = [f"{'passe':<40} {'ms':>10} {'règles':>8} {'symboles':>9} {'nouv. NT':>8} {'NT évités':>9}"
+                  + (f" {'mém. Kio':>10} {'pic Kio':>10}" if self.memoire else "")]
+        for passe in self.passes:
+            ligne = (f"{passe['passe']:<40} {passe['temps_s'] * 1000:10.3f} {passe['regles']:>8} "
+                     f"{passe['symboles']:>9} {passe['nouveaux_nt']:>8} {passe['nt_evites']:>9}")
+            if self.memoire:
+                ligne += f" {passe['memoire_o'] / 1024:10.1f} {passe['pic_o'] / 1024:10.1f}"
+            lignes.append(ligne)
+        return "\n".join(lignes)
 
 ##############################
 # Classe Grammaire
 ##############################
 class Grammaire:
     def __init__(self):
-        self.regles = defaultdict(list)
+        self._analyses = None
+        self.observateur = None  # voir ProfilPasses : prévenu à la fin de chaque passe
+        # non-terminal -> parties droites (tuples d'identifiants, () = epsilon),
+        # rangées comme clés d'un dict : ensemble ordonné, sans doublon
+        self.regles = defaultdict(dict)
         self.axiome = None
-        self.genNT = GenerateurNonTerminaux()
+        self.symboles = TableSymboles()
+        # non-terminaux que _term et _bin n'ont pas créés en réutilisant celui
+        # d'un terminal ou d'une fin de règle déjà rencontrés
+        self.nt_evites = 0
+
+    @property
+    def regles(self):
+        return self._regles
+
+    @regles.setter
+    def regles(self, regles):
+        self._regles = regles
+        self._invalider_analyses()
+
+    def _invalider_analyses(self):
+        """A appeler après toute modification des règles en place."""
+        self._analyses = None
 
     ##############################
     # Lecture / écriture
@@ -36,39 +182,59 @@ class Grammaire:
             S -> AB | a
             A -> aA | E"""
         with open(fichier, "r") as f:
-            for ligne in f:
-                ligne = ligne.strip().replace(" ", "")
-                if ligne:
-                    gauche, droite = ligne.split("->")
-                    if self.axiome is None:
-                        self.axiome = gauche
-                    for seq in droite.split("|"):
-                        self.regles[gauche].append(list(seq))
-
-    def ecrire(self, fichier):
-        """Renvoit la grammaire dans un fichier. Les epsilon sont notées "E"."""
+            self.lire_texte(f.read())
+
+    def lire_texte(self, texte):
+        """Comme lire, à partir du contenu du fichier."""
+        for ligne in texte.splitlines():
+            ligne = ligne.strip().replace(" ", "")
+            if ligne:
+                gauche, droite = ligne.split("->")
+                gauche = self.symboles.symbole(gauche)
+                if self.axiome is None:
+                    self.axiome = gauche
+                for seq in droite.split("|"):
+                    # "E" (epsilon) ne produit rien : E seul donne la séquence vide
+                    self.regles[gauche][tuple(self.symboles.symbole(c) for c in seq if c != "E")] = None
+        self._invalider_analyses()
+
+    def ecrire(self, fichier, compilee=False):
+        """
+        Renvoit la grammaire dans un fichier. Les epsilon sont notées "E".
+        Avec compilee=True, le fichier est au format binaire de Compilation.py,
+        que Generateur charge sans découper de texte.
+        """
+        if compilee:
+            GrammaireCompilee.depuis_grammaire(self).ecrire(fichier)
+            return
         with open(fichier, "w") as f:
-            for gauche, list_seq in self.regles.items():
-                droites = []
-                for seq in list_seq:
-                    if seq == []:
-                        droites.append("E")
-                    else:
-                        droites.append("".join(seq))
-                line = " | ".join(droites)
-                f.write(f"{gauche} -> {line}\n")
+            f.write(self.texte())
 
-    def afficher_regles(self, message):
-        """Affiche la grammaire à l'écran. (FONCTION DE DEBUG)"""
-        for gauche, list_seq in self.regles.items():
-            if list_seq:
-                droites = []
-                for seq in list_seq:
-                    if seq == []:
-                        droites.append("E")
-                    else:
-                        droites.append("".join(seq))
-                #print(f"{gauche} -> {' | '.join(droites)}")
+    def texte(self):
+        """
+        La grammaire au format des fichiers, une ligne par non-terminal.
+        L'axiome est écrit en premier : c'est ainsi qu'il est reconnu à la lecture.
+        Un non-terminal sans règle n'est pas écrit : "S -> " se relirait S -> E.
+        Si c'est l'axiome, le langage est vide et rien n'est écrit (sinon le
+        premier autre non-terminal deviendrait l'axiome à la lecture).
+        """
+        if not self.regles.get(self.axiome):
+            return ""
+        lignes = []
+        ordre = sorted(self.regles, key=lambda nt: nt != self.axiome)
+        for gauche in ordre:
+            list_seq = self.regles[gauche]
+            if not list_seq:
+                continue
+            droites = [self.symboles.texte(seq) for seq in list_seq]
+            line = " | ".join(droites)
+            lignes.append(f"{self.symboles.nom(gauche)} -> {line}\n")
+        return "".join(lignes)
+
+    def _etape(self, message):
+        """Fin d'une passe : prévient l'observateur s'il y en a un (sinon ne coûte rien)."""
+        if self.observateur is not None:
+            self.observateur.etape(self, message)
 
 
     ##############################
@@ -85,21 +251,21 @@ class Grammaire:
           - _unit
           - _nettoyer_regles
         """
-        self.afficher_regles("Avant réduction :")
+        self._etape("Avant réduction :")
         self.reduire()
-        self.afficher_regles("Après réduction :")
+        self._etape("Après réduction :")
         self._start()
-        self.afficher_regles("Après START :")
+        self._etape("Après START :")
         self._term()
-        self.afficher_regles("Après TERM :")
+        self._etape("Après TERM :")
         self._bin()
-        self.afficher_regles("Après BIN :")
+        self._etape("Après BIN :")
         self._del_epsilon()
-        self.afficher_regles("Après DEL :")
+        self._etape("Après DEL :")
         self._unit()
-        self.afficher_regles("Après UNIT :")
+        self._etape("Après UNIT :")
         self._nettoyer_regles()
-        self.afficher_regles("Après nettoyage :")
+        self._etape("Après nettoyage :")
         return self.regles
 
     ##############################
@@ -116,7 +282,7 @@ class Grammaire:
           4) _del_epsilon
           5) Validation forme normale de Greibach
         """
-        self.afficher_regles("Avant transformation Greibach :")
+        self._etape("Avant transformation Greibach :")
 
         #1) On liste les NT dans un ordre
         non_terminaux = list(self.regles.keys())
@@ -139,165 +305,423 @@ class Grammaire:
 
             # éliminer rec. gauche directe
             self._elim_recursivite_gauche_directe(Ai)
-        self.afficher_regles("Après Substitutions + récursion gauche :")
+        self._etape("Après Substitutions + récursion gauche :")
         # On créer ou non un S0
         self._start_greibach()
-        self.afficher_regles("Après START :")
+        self._etape("Après START :")
 
         # 3) Placer un terminal en tête
         self._placer_terminal_en_tete()
-        self.afficher_regles("Après terminaux en tête :")
+        self._etape("Après terminaux en tête :")
 
         # 4) suppression des epsilon en dehors de l'axiome:
         self._del_epsilon()
-        self.afficher_regles("Après DEL \n Forme finale :")
+        self._etape("Après DEL :")
+        self._valider_greibach()
+
+    def greibach_polynomiale(self):
+        """
+        Transformation en forme normale de Greibach de taille polynomiale
+        (transformation par coin gauche, à la Rosenkrantz / Blum-Koch),
+        à partir de la forme normale de Chomsky :
+          1) chomsky() (qui ne laisse aucune règle unitaire)
+          2) pour chaque paire (A, B) avec A =>+ B w par coins gauches, un
+             non-terminal N(A,B) qui engendre ces w (jamais vides)
+          3) A -> a | a N(A,B)                pour A -> a et B -> a
+             N(A,B) -> Y | Y N(A,C)           pour C -> B Y (Y seul si C = A)
+          4) chaque tête Y de l'étape 3 est substituée une seule fois par les
+             règles de Y de l'étape 3, qui commencent déjà par un terminal
+        La grammaire obtenue a O(|G|^3) règles, sans point fixe sur les têtes.
+        """
+        self.chomsky()
+        terminal = self.symboles.terminal
+
+        # B -> a : terminaux de B ; C -> B Y : (C, Y) rangés sous le coin gauche B
+        terminaux_de = defaultdict(list)
+        par_coin = defaultdict(list)
+        for gauche, sequences in self.regles.items():
+            for seq in sequences:
+                if len(seq) == 1 and terminal[seq[0]]:
+                    terminaux_de[gauche].append(seq[0])
+                elif len(seq) == 2:
+                    par_coin[seq[0]].append((gauche, seq[1]))
+        coins = self._coins_gauches()
+
+        # 3) règles des non-terminaux d'origine (déjà en tête terminale)
+        originaux = {}
+        paires = {}
+        for a_nt in self.regles:
+            regles_a = {}
+            for a in terminaux_de[a_nt]:
+                regles_a[(a,)] = None
+            for b_nt in coins[a_nt]:
+                if terminaux_de[b_nt]:
+                    n_ab = self._paire(paires, a_nt, b_nt)
+                    for a in terminaux_de[b_nt]:
+                        regles_a[(a, n_ab)] = None
+            if () in self.regles[a_nt]:
+                regles_a[()] = None
+            originaux[a_nt] = regles_a
+
+        # 3-4) règles des N(A,B), tête Y substituée une seule fois
+        nouvelles_regles = dict(originaux)
+        a_traiter = list(paires.items())
+        while a_traiter:
+            (a_nt, b_nt), n_ab = a_traiter.pop()
+            regles_n = {}
+            for c_nt, y in par_coin[b_nt]:
+                if c_nt == a_nt:
+                    regles_n.update(originaux[y])
+                if c_nt in coins[a_nt]:
+                    if (a_nt, c_nt) not in paires:
+                        a_traiter.append(((a_nt, c_nt), self._paire(paires, a_nt, c_nt)))
+                    n_ac = paires[(a_nt, c_nt)]
+                    for alt in originaux[y]:
+                        regles_n[alt + (n_ac,)] = None
+            regles_n.pop((), None)
+            nouvelles_regles[n_ab] = regles_n
+        self.regles = nouvelles_regles
+        self._etape("Après coin gauche :")
+
+        accessibles = self._trouver_accessibles()
+        self._filtrer_regles(accessibles)
+        self._etape("Après filtrage des accessibles :")
         self._valider_greibach()
 
     ##############################
     # Sous-fonctions communes
     ##############################
     def reduire(self):
-        """Supprime symboles non-accessibles + non-coaccessibles."""
+        """
+        Supprime symboles non-coaccessibles puis non-accessibles.
+        Si l'axiome n'engendre aucun mot, il ne reste aucune règle (langage vide).
+        """
         coaccessibles = self._trouver_coaccessibles()
+        if self.axiome not in coaccessibles:
+            self.regles = defaultdict(dict)
+            return
+        self._filtrer_regles(coaccessibles)
         accessibles = self._trouver_accessibles()
         self._filtrer_regles(accessibles)
 
+    def _nouvel_axiome(self):
+        """Non-terminal S0 (ou un non-terminal frais si le nom S0 est déjà pris)."""
+        if "S0" in self.symboles.ids:
+            return self.symboles.nouveau_non_terminal()
+        return self.symboles.symbole("S0")
+
     def _start(self):
         """Ajoute un nouvel axiome S0 -> S."""
-        nouvel_axiome = "S0"
-        if nouvel_axiome not in self.regles:
-            self.regles[nouvel_axiome] = []
-        self.regles[nouvel_axiome].append([self.axiome])
+        nouvel_axiome = self._nouvel_axiome()
+        self.regles[nouvel_axiome] = {(self.axiome,): None}
         self.axiome = nouvel_axiome
+        self._invalider_analyses()
 
     def _term(self):
-        """Remplace les terminaux par des non-terminaux (sauf si la règle = 1 terminal)."""
+        """
+        Remplace les terminaux par des non-terminaux (sauf si la règle = 1 terminal).
+        Un seul non-terminal X -> a par terminal a, partagé par toutes les règles.
+        """
+        terminal = self.symboles.terminal
+        remplacants = {}
         nouvelles_regles = {}
         for gauche, sequences in self.regles.items():
+            nouvelles = {}
             for seq in sequences:
-                for i, symbole in enumerate(seq):
-                    # Si c'est un terminal (miniscule avec islower) et qu'il n'est pas seul
-                    if symbole.islower() and (i > 0 or len(seq) > 1):
-                        nouveau = self.genNT.suivant()
-                        if nouveau not in nouvelles_regles:
-                            nouvelles_regles[nouveau] = [[symbole]]
-                        seq[i] = nouveau
+                if len(seq) >= 2:
+                    nouvelle = list(seq)
+                    for i, symbole in enumerate(seq):
+                        # Si c'est un terminal et qu'il n'est pas seul
+                        if terminal[symbole]:
+                            nouveau = remplacants.get(symbole)
+                            if nouveau is None:
+                                nouveau = remplacants[symbole] = self.symboles.nouveau_non_terminal()
+                                nouvelles_regles[nouveau] = {(symbole,): None}
+                            else:
+                                self.nt_evites += 1
+                            nouvelle[i] = nouveau
+                    seq = tuple(nouvelle)
+                nouvelles[seq] = None
+            self.regles[gauche] = nouvelles
         # on fusionne
         for k, v in nouvelles_regles.items():
             self.regles[k] = v
+        self._invalider_analyses()
 
     def _bin(self):
-        """transformer règles de longueur > 2."""
+        """
+        transformer règles de longueur > 2 (A -> X1 N1, N1 -> X2 N2, ...).
+        Chaque fin de règle (X2 ... Xk) n'a qu'un non-terminal, partagé par
+        toutes les règles qui se terminent ainsi : une fin déjà vue évite de
+        recréer toute sa chaîne.
+        """
+        suffixes = {}
         nouvelles_regles = {}
         for gauche, sequences in self.regles.items():
+            nouvelles = {}
             for seq in sequences:
-                while len(seq) > 2:
-                    nouveau = self.genNT.suivant()
-                    nouvelles_regles[nouveau] = [seq[1:]]
-                    seq[:] = [seq[0], nouveau]
+                if len(seq) > 2:
+                    # fins de règle encore sans non-terminal, de la plus longue à la plus courte
+                    manquantes = []
+                    reste = seq[1:]
+                    while reste not in suffixes:
+                        manquantes.append(reste)
+                        if len(reste) == 2:
+                            break
+                        reste = reste[1:]
+                    else:
+                        self.nt_evites += len(reste) - 1
+                    for suite in manquantes:
+                        suffixes[suite] = self.symboles.nouveau_non_terminal()
+                    for suite in manquantes:
+                        droite = suite if len(suite) == 2 else (suite[0], suffixes[suite[1:]])
+                        nouvelles_regles[suffixes[suite]] = {droite: None}
+                    seq = (seq[0], suffixes[seq[1:]])
+                nouvelles[seq] = None
+            self.regles[gauche] = nouvelles
         for k, v in nouvelles_regles.items():
             self.regles[k] = v
+        self._invalider_analyses()
 
     def _del_epsilon(self):
-        """Supprimer les epsilon-règles hors axiome."""
+        """
+        Supprimer les epsilon-règles hors axiome.
+        Après _bin les règles ont au plus 2 symboles : chacune donne au plus
+        3 variantes non vides (XY, X, Y), sans passer par l'énumération générale.
+        Un non-terminal qui n'engendrait que E n'a plus de règle : les règles
+        qui le contiennent encore sont retirées (filtrage des coaccessibles).
+        """
         annulables = self._trouver_annulables()
-        nouvelles_regles = defaultdict(list)
+        nouvelles_regles = defaultdict(dict)
         for gauche, sequences in self.regles.items():
+            nouvelles = nouvelles_regles[gauche]
             for seq in sequences:
-                if seq == ["E"] and gauche == self.axiome:
+                if len(seq) == 2:
+                    x, y = seq
+                    nouvelles[seq] = None
+                    if y in annulables:
+                        nouvelles[(x,)] = None
+                    if x in annulables:
+                        nouvelles[(y,)] = None
+                    if x in annulables and y in annulables and gauche == self.axiome:
+                        nouvelles[()] = None
+                elif len(seq) == 1:
+                    nouvelles[seq] = None
+                    if seq[0] in annulables and gauche == self.axiome:
+                        nouvelles[()] = None
+                elif seq == ():
                     # on conserve si c'est l'axiome
-                    nouvelles_regles[gauche].append(["E"])
-                elif seq != ["E"]:
-                    combos = self._generer_combinaisons(seq, annulables)
-                    for c in combos:
-                        if c == [] and gauche != self.axiome:
+                    if gauche == self.axiome:
+                        nouvelles[()] = None
+                else:
+                    for c in self._generer_combinaisons(seq, annulables):
+                        if c == () and gauche != self.axiome:
                             # ignore epsilon hors axiome
                             continue
-                        nouvelles_regles[gauche].append(c)
+                        nouvelles[c] = None
         self.regles = nouvelles_regles
+        self._filtrer_regles(self._trouver_coaccessibles())
 
     def _generer_combinaisons(self, seq, annulables):
-        """Génère toutes combinaisons en retirant les symboles annulables."""
-        combi = {tuple(seq)}
-        for i, s in enumerate(seq):
+        """
+        Génère toutes combinaisons en retirant les symboles annulables
+        (cas général, pour les règles de plus de 2 symboles).
+        """
+        combi = [()]
+        for s in seq:
             if s in annulables:
-                new_combi = set()
-                for c in combi:
-                    # suppr le s i
-                    c_list = list(c)
-                    del c_list[i]
-                    new_combi.add(tuple(c_list))
-                combi |= new_combi
-        return list(map(list, combi))
+                combi = [c + (s,) for c in combi] + combi
+            else:
+                combi = [c + (s,) for c in combi]
+        return list(dict.fromkeys(combi))
 
     def _unit(self):
-        """Supprime les règles unitaires (A->B)."""
-        for gauche, list_seq in list(self.regles.items()):
-            nouvelles = []
-            for seq in list_seq:
-                if len(seq) == 1 and seq[0].isupper():
-                    # On remplace par les alternatives de seq[0]
-                    nouvelles.extend(self.regles[seq[0]])
+        """
+        Supprime les règles unitaires (A->B), chaînes et cycles compris, sur
+        le graphe des paires unitaires :
+          - chaque composante fortement connexe (A =>+ B et B =>+ A) est
+            fusionnée en un seul non-terminal, l'axiome s'il en fait partie ;
+          - les composantes sont fermées des puits vers les sources : une règle
+            unitaire vers une autre composante y est remplacée par les règles
+            déjà fermées de celle-ci ;
+          - un non-terminal sans règle unitaire garde son ensemble de règles, et
+            celui qui n'a qu'une règle unitaire partage l'ensemble de sa cible
+            au lieu de le recopier.
+        """
+        terminal = self.symboles.terminal
+        def unitaire(seq):
+            return len(seq) == 1 and not terminal[seq[0]]
+        successeurs = {gauche: [seq[0] for seq in sequences if unitaire(seq)]
+                       for gauche, sequences in self.regles.items()}
+        composantes = self._composantes_fortement_connexes(successeurs)
+
+        # fusion des cycles : membre -> représentant
+        ordre = {nt: i for i, nt in enumerate(self.regles)}
+        representant = {}
+        for composante in composantes:
+            if len(composante) > 1:
+                composante.sort(key=lambda nt: (nt != self.axiome, ordre[nt]))
+                for nt in composante[1:]:
+                    representant[nt] = composante[0]
+
+        fermees = {}
+        for composante in composantes:
+            rep = composante[0]
+            sequences = [seq for nt in composante for seq in self.regles.get(nt, ())]
+            unitaires = [seq[0] for seq in sequences if unitaire(seq)]
+            if not representant and not unitaires:
+                fermees[rep] = self.regles.get(rep, {})
+                continue
+            if len(sequences) == len(unitaires) == 1:
+                cible = representant.get(unitaires[0], unitaires[0])
+                if cible != rep and () not in fermees[cible]:
+                    fermees[rep] = fermees[cible]
+                    continue
+            nouvelles = {}
+            for seq in sequences:
+                if not unitaire(seq):
+                    if representant:
+                        seq = tuple(representant.get(s, s) for s in seq)
+                    nouvelles[seq] = None
                 else:
-                    nouvelles.append(seq)
-            self.regles[gauche] = nouvelles
+                    cible = representant.get(seq[0], seq[0])
+                    if cible != rep:
+                        # epsilon ne passe pas par une règle unitaire (il reste à l'axiome)
+                        vide = () in nouvelles
+                        nouvelles.update(fermees[cible])
+                        if not vide:
+                            nouvelles.pop((), None)
+            fermees[rep] = nouvelles
+        self.regles = defaultdict(dict, ((nt, fermees[nt]) for nt in self.regles if nt not in representant))
+
+    def _composantes_fortement_connexes(self, successeurs):
+        """
+        Composantes fortement connexes du graphe successeurs (algorithme de
+        Tarjan, sans récursion), dans l'ordre topologique inverse : chaque
+        composante vient après toutes celles qu'elle atteint.
+        """
+        index = {}
+        bas = {}
+        pile = []
+        sur_pile = set()
+        composantes = []
+        for depart in successeurs:
+            if depart in index:
+                continue
+            index[depart] = bas[depart] = len(index)
+            pile.append(depart)
+            sur_pile.add(depart)
+            appels = [(depart, iter(successeurs[depart]))]
+            while appels:
+                nt, suivants = appels[-1]
+                for suivant in suivants:
+                    if suivant not in index:
+                        index[suivant] = bas[suivant] = len(index)
+                        pile.append(suivant)
+                        sur_pile.add(suivant)
+                        appels.append((suivant, iter(successeurs.get(suivant, ()))))
+                        break
+                    if suivant in sur_pile:
+                        bas[nt] = min(bas[nt], index[suivant])
+                else:
+                    appels.pop()
+                    if appels:
+                        parent = appels[-1][0]
+                        bas[parent] = min(bas[parent], bas[nt])
+                    if bas[nt] == index[nt]:
+                        composante = []
+                        while True:
+                            membre = pile.pop()
+                            sur_pile.discard(membre)
+                            composante.append(membre)
+                            if membre == nt:
+                                break
+                        composantes.append(composante)
+        return composantes
 
     def _nettoyer_regles(self):
-        """Supprime doublons etc."""
+        """
+        Les doublons sont déjà écartés à chaque passe (ensembles ordonnés) :
+        il reste à supprimer les règles triviales A -> A.
+        """
         for gauche, list_seq in self.regles.items():
-            uniques = []
-            for seq in list_seq:
-                if seq not in uniques:
-                    uniques.append(seq)
-            self.regles[gauche] = uniques
+            list_seq.pop((gauche,), None)
+        self._invalider_analyses()
 
 
     ##############################
     # Sous-fonctions Greibach
     ##############################
+    def _coins_gauches(self):
+        """
+        coins[A] = non-terminaux B tels que A =>+ B w en développant toujours
+        le symbole le plus à gauche (grammaire en forme de Chomsky).
+        """
+        terminal = self.symboles.terminal
+        directs = {}
+        for gauche, sequences in self.regles.items():
+            directs[gauche] = {seq[0] for seq in sequences if len(seq) == 2 and not terminal[seq[0]]}
+        coins = {}
+        for gauche in self.regles:
+            atteints = set()
+            a_voir = list(directs[gauche])
+            while a_voir:
+                nt = a_voir.pop()
+                if nt not in atteints:
+                    atteints.add(nt)
+                    a_voir.extend(directs.get(nt, ()))
+            coins[gauche] = atteints
+        return coins
+
+    def _paire(self, paires, a_nt, b_nt):
+        """Non-terminal N(A,B), créé à la première demande."""
+        if (a_nt, b_nt) not in paires:
+            paires[(a_nt, b_nt)] = self.symboles.nouveau_non_terminal()
+        return paires[(a_nt, b_nt)]
+
     def _start_greibach(self):
         """
         Crée un nouvel axiome S0 uniquement si:
-        - La grammaire peut produire le mot vide (il existe un X -> E), ET
-        - L'axiome actuel n'est pas annulable.
-        Sinon on ne fait rien du tout
-        """
-        # on vérif si il y a au moins un E dans notre grammaire
-        grammaire_a_epsilon = any(any(seq == ["E"] for seq in seqs)for seqs in self.regles.values())
-        if not grammaire_a_epsilon:
-            # => pas besoin de S0 car pas de epsilon
-            return
-
+        - L'axiome actuel est annulable (le langage contient le mot vide), ET
+        - L'axiome apparaît dans une partie droite : il ne pourrait pas garder
+          sa règle S -> E après _del_epsilon.
+        Sinon on ne fait rien du tout (un axiome non annulable ne doit surtout
+        pas recevoir S0 -> E : le mot vide n'est pas dans le langage)
+        """
         #on vérif si l'axiome est annulable
         annulables = self._trouver_annulables()
-        if self.axiome in annulables:
-            #l'axiome peut déjà faire E on return
+        if self.axiome not in annulables:
+            # => pas de mot vide dans le langage
+            return
+
+        # on vérif si l'axiome apparaît à droite
+        if not any(self.axiome in seq for seqs in self.regles.values() for seq in seqs):
+            # => il garde sa règle S -> E, pas besoin de S0
             return
 
         #sinon on créer un axiome S0 -> S | E
-        nouvel_axiome = "S0"
-        if nouvel_axiome not in self.regles:
-            self.regles[nouvel_axiome] = []
+        nouvel_axiome = self._nouvel_axiome()
         # règle S0 -> S
-        self.regles[nouvel_axiome].append([self.axiome])
         # règle S0 -> E
-        self.regles[nouvel_axiome].append(["E"])
+        self.regles[nouvel_axiome] = {(self.axiome,): None, (): None}
         self.axiome = nouvel_axiome
+        self._invalider_analyses()
 
     def _substitution(self, Ai, Aj):
         """
         Substitue dans Ai les règles Ai->Aj alpha
         en Ai->(prodAj) alpha, pour chaque prodAj de Aj.
         """
-        nouvelles = []
+        nouvelles = {}
         for seq in self.regles[Ai]:
             if seq and seq[0] == Aj:
                 suffix = seq[1:]
                 for alt in self.regles[Aj]:
-                    nouvelles.append(alt + suffix)
+                    nouvelles[alt + suffix] = None
             else:
-                nouvelles.append(seq)
+                nouvelles[seq] = None
         self.regles[Ai] = nouvelles
+        self._invalider_analyses()
 
     def _elim_recursivite_gauche_directe(self, Ai):
         """
@@ -315,148 +739,485 @@ class Grammaire:
         if not alpha:
             return
 
-        Ai_prime = self.genNT.suivant()
-        self.regles[Ai_prime] = []
+        Ai_prime = self.symboles.nouveau_non_terminal()
+        self.regles[Ai_prime] = {}
 
         # A_i -> beta Ai'
-        new_Ai = []
+        new_Ai = {}
         for b in beta:
-            new_Ai.append(b + [Ai_prime])
+            new_Ai[b + (Ai_prime,)] = None
         self.regles[Ai] = new_Ai
 
         # Ai' -> alpha Ai' | E
-        new_Ai_prime = []
+        new_Ai_prime = {}
         for a in alpha:
-            new_Ai_prime.append(a + [Ai_prime])
-        new_Ai_prime.append(["E"])
+            new_Ai_prime[a + (Ai_prime,)] = None
+        new_Ai_prime[()] = None
         self.regles[Ai_prime] = new_Ai_prime
+        self._invalider_analyses()
 
     def _placer_terminal_en_tete(self):
         """
         Tant qu'une règle commence par un non-terminal X,
         on substitue X par ses alternatives.
         """
+        terminal = self.symboles.terminal
         changed = True
         while changed:
             changed = False
             for nt, list_seq in list(self.regles.items()):
-                nouvelles = []
+                nouvelles = {}
                 for seq in list_seq:
-                    if seq == []:
+                    if seq == ():
                         # epsilon
-                        nouvelles.append(seq)
-                    elif seq[0].islower():
+                        nouvelles[seq] = None
+                    elif terminal[seq[0]]:
                         # déjà terminal
-                        nouvelles.append(seq)
+                        nouvelles[seq] = None
                     else:
                         head = seq[0]
                         if head in self.regles:
                             # substituer
                             for alt in self.regles[head]:
-                                nouvelles.append(alt + seq[1:])
+                                nouvelles[alt + seq[1:]] = None
                             changed = True
                         else:
                             # inconnu ? on laisse
-                            nouvelles.append(seq)
+                            nouvelles[seq] = None
                 self.regles[nt] = nouvelles
+        self._invalider_analyses()
+
+    def nombre_regles(self):
+        """Nombre total de règles (parties droites) de la grammaire."""
+        return sum(len(seqs) for seqs in self.regles.values())
 
     def _valider_greibach(self):
         for gauche, list_seq in self.regles.items():
             for seq in list_seq:
-                if seq == []:
+                if seq == ():
                     # epsilon => autorisé si c'est l'axiome
                     if gauche != self.axiome:
-                        raise ValueError(f"Règle {gauche} -> ε hors axiome interdit")
-                elif seq == ["E"]:
-                    # on autorise seulement si c'est l'axiome
-                    if gauche != self.axiome:
-                        raise ValueError(f"Règle {gauche} -> E hors axiome interdit")
+                        raise ValueError(f"Règle {self.symboles.nom(gauche)} -> E hors axiome interdit")
                 else:
                     # Règle "normale" => doit commencer par un minuscule
-                    if not seq[0].islower():
+                    if not self.symboles.terminal[seq[0]]:
                         raise ValueError(
-                            f"La règle {gauche} -> {''.join(seq)} "
+                            f"La règle {self.symboles.nom(gauche)} -> {self.symboles.texte(seq)} "
                             "ne commence pas par un terminal => pas forme normale de greibach"
                         )
 
     ##############################
     # Fonctions d'accessibilité
     ##############################
+    def _analyser(self):
+        """
+        Calcule en temps linéaire les annulables (transitivement), les
+        coaccessibles (productifs) et les accessibles. On construit une seule
+        fois l'index symbole -> règles qui le contiennent, puis chaque ensemble
+        est obtenu par une liste de travail avec un compteur par règle : une
+        règle est décomptée à chaque fois qu'un de ses symboles est validé.
+        Le résultat est gardé jusqu'à la prochaine modification des règles.
+        """
+        if self._analyses is not None:
+            return self._analyses
+        terminal = self.symboles.terminal
+        tetes = []        # règle -> non-terminal gauche
+        longueurs = []    # règle -> nb de symboles
+        non_terminaux = []  # règle -> nb d'occurrences de non-terminaux
+        occurrences = defaultdict(list)  # symbole -> règles où il apparaît
+        for gauche, sequences in self.regles.items():
+            for seq in sequences:
+                r = len(tetes)
+                tetes.append(gauche)
+                longueurs.append(len(seq))
+                nb = 0
+                for symb in seq:
+                    if not terminal[symb]:
+                        occurrences[symb].append(r)
+                        nb += 1
+                non_terminaux.append(nb)
+
+        def point_fixe(compteurs):
+            # une règle dont le compteur tombe à 0 valide son non-terminal gauche
+            valides = set()
+            a_traiter = []
+            for r, c in enumerate(compteurs):
+                if c == 0 and tetes[r] not in valides:
+                    valides.add(tetes[r])
+                    a_traiter.append(tetes[r])
+            while a_traiter:
+                symb = a_traiter.pop()
+                for r in occurrences.get(symb, ()):
+                    compteurs[r] -= 1
+                    if compteurs[r] == 0 and tetes[r] not in valides:
+                        valides.add(tetes[r])
+                        a_traiter.append(tetes[r])
+            return valides
+
+        # un terminal n'est jamais décompté : seule une règle sans terminal peut être annulable
+        annulables = point_fixe([l if l == nt else -1 for l, nt in zip(longueurs, non_terminaux)])
+        coaccessibles = point_fixe(list(non_terminaux))
+
+        accessibles = {self.axiome}
+        a_traiter = [self.axiome]
+        while a_traiter:
+            g = a_traiter.pop()
+            for s in self.regles.get(g, ()):
+                for symb in s:
+                    if not terminal[symb] and symb not in accessibles:
+                        accessibles.add(symb)
+                        a_traiter.append(symb)
+
+        self._analyses = {
+            "annulables": annulables,
+            "coaccessibles": coaccessibles,
+            "accessibles": accessibles,
+        }
+        return self._analyses
+
     def _trouver_annulables(self):
-        annulables = set()
-        for g, seqs in self.regles.items():
-            for s in seqs:
-                if s == ["E"] or s == []:
-                    annulables.add(g)
-        return annulables
+        return self._analyser()["annulables"]
 
     def _trouver_coaccessibles(self):
-        coaccessibles = set()
-        changement = True
-        while changement:
-            changement = False
-            for g, seqs in self.regles.items():
-                if g in coaccessibles:
-                    continue
-                for s in seqs:
-                    if all(symb.islower() or symb in coaccessibles for symb in s if symb != "E"):
-                        coaccessibles.add(g)
-                        changement = True
-                        break
-        #print("Variables coaccessibles :", coaccessibles)
-        return coaccessibles
+        return self._analyser()["coaccessibles"]
 
     def _trouver_accessibles(self):
-        accessibles = {self.axiome}
-        changement = True
-        while changement:
-            changement = False
-            for g, seqs in self.regles.items():
-                if g in accessibles:
-                    for s in seqs:
-                        for symb in s:
-                            if symb.isupper() and symb not in accessibles:
-                                accessibles.add(symb)
-                                changement = True
-        #print("Variables accessibles :", accessibles)
-        return accessibles
+        return self._analyser()["accessibles"]
 
     def _filtrer_regles(self, accessibles):
+        terminal = self.symboles.terminal
         new_regles = {}
         for g, seqs in self.regles.items():
             if g in accessibles:
-                newseqs = []
+                newseqs = {}
                 for s in seqs:
                     # on garde la prod si tous ses symboles NT sont dans accessibles
-                    if all((not x.isupper()) or (x in accessibles) for x in s):
-                        newseqs.append(s)
+                    if all(terminal[x] or (x in accessibles) for x in s):
+                        newseqs[s] = None
                 if newseqs:
                     new_regles[g] = newseqs
         self.regles = new_regles
         #print("Règles après accessibilité :", self.regles)
 
+##############################
+# Conversion avec cache
+##############################
+REPERTOIRE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_grammaires")
+
+def version_convertisseur():
+    """Empreinte du code de conversion : toute modification de ce fichier invalide le cache."""
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def convertir(fichier_entree, etape, cache=None, observateur=None):
+    """
+    Texte de la grammaire convertie, étape "chomsky", "classique" (Greibach)
+    ou "coin-gauche" (Greibach polynomiale). La forme canonique de l'entrée
+    est la grammaire relue puis réécrite (espaces, doublons et lignes
+    répétées n'y comptent plus), complétée par l'ordre d'apparition des
+    symboles. Un succès dans le cache évite toute la conversion, sauf avec
+    un observateur qui doit voir les passes.
+    """
+    grammaire = Grammaire()
+    grammaire.lire(fichier_entree)
+    grammaire.observateur = observateur
+    if cache is not None:
+        cle = cache.cle(etape, grammaire.texte(), " ".join(grammaire.symboles.noms))
+        texte = cache.lire(cle) if observateur is None else None
+        if texte is not None:
+            return texte
+    if etape == "chomsky":
+        grammaire.chomsky()
+    elif etape == "classique":
+        grammaire.greibach()
+    else:
+        grammaire.greibach_polynomiale()
+    texte = grammaire.texte()
+    if cache is not None:
+        cache.ecrire(cle, texte)
+    return texte
+
+def ecrire_sortie(fichier, texte, compiler=False):
+    """Écrit une grammaire convertie et, si demandé, sa version compilée dans fichier + ".bin"."""
+    with open(fichier, "w") as f:
+        f.write(texte)
+    if compiler:
+        GrammaireCompilee.depuis_texte(texte).ecrire(fichier + ".bin")
+
+def nombre_regles_texte(texte):
+    """Nombre de parties droites d'une grammaire écrite au format des fichiers."""
+    return sum(ligne.count("|") + 1 for ligne in texte.splitlines() if ligne.strip())
+
+##############################
+# Conversion par lots
+##############################
+def verifier_conversion(fichier_entree, longueur_max):
+    """
+    Compare les langages du .general et de ses .chomsky/.greibach jusqu'à
+    longueur_max. Renvoie None s'ils coïncident, sinon le contre-exemple
+    sous forme de message.
+    """
+    from Equivalence import premier_contre_exemple, rapport  # Equivalence importe Grammaire
+    fichiers = [fichier_entree] + [fichier_entree.replace(".general", extension)
+                                   for extension in (".chomsky", ".greibach")]
+    mot, engendrent, communs = premier_contre_exemple(fichiers, longueur_max)
+    if mot is None:
+        return None
+    return rapport(fichiers, longueur_max, mot, engendrent, communs)
+
+# les sorties sont nommées en remplaçant .general : sans lui, elles écraseraient l'entrée
+ERREUR_EXTENSION = "extension autre que .general (la sortie écraserait l'entrée)"
+
+class DelaiDepasse(Exception):
+    pass
+
+def _delai_depasse(signum, frame):
+    raise DelaiDepasse()
+
+def convertir_fichier(fichier_entree, algo="classique", cache=None, verifier=0, compiler=False, delai=None):
+    """
+    Écrit les formes de Chomsky et de Greibach d'un fichier .general, puis
+    compare les langages jusqu'à la longueur `verifier` (si non nul).
+    Renvoie un bilan (durées en secondes, succès du cache, erreur éventuelle)
+    sans jamais lever d'exception, pour qu'un fichier en échec n'arrête pas le lot.
+    Avec un délai (en secondes, processus travailleur seulement : SIGALRM),
+    une conversion trop longue est interrompue et notée "délai dépassé"
+    (l'algorithme de Greibach classique ne termine pas sur toutes les grammaires).
+    """
+    if not fichier_entree.endswith(".general"):
+        return _bilan_echec(fichier_entree, ERREUR_EXTENSION)
+    bilan = {"fichier": fichier_entree, "chomsky": None, "greibach": None,
+             "succes_cache": 0, "echecs_cache": 0, "erreur": None}
+    if cache is not None:
+        succes, echecs = cache.succes, cache.echecs
+    if delai:
+        precedent = signal.signal(signal.SIGALRM, _delai_depasse)
+    try:
+        try:
+            if delai:
+                signal.setitimer(signal.ITIMER_REAL, delai)
+            for etape, extension in [("chomsky", ".chomsky"), (algo, ".greibach")]:
+                debut = time.perf_counter()
+                texte = convertir(fichier_entree, etape, cache)
+                ecrire_sortie(fichier_entree.replace(".general", extension), texte, compiler)
+                bilan["chomsky" if etape == "chomsky" else "greibach"] = time.perf_counter() - debut
+            if verifier:
+                bilan["erreur"] = verifier_conversion(fichier_entree, verifier)
+        finally:
+            if delai:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except DelaiDepasse:
+        bilan["erreur"] = f"délai dépassé ({delai:g} s)"
+    except Exception as e:
+        bilan["erreur"] = f"{type(e).__name__}: {e}"
+    if delai:
+        signal.signal(signal.SIGALRM, precedent)
+    if cache is not None:
+        bilan["succes_cache"] = cache.succes - succes
+        bilan["echecs_cache"] = cache.echecs - echecs
+    return bilan
+
+def _convertir_paquet(paquet, algo, cache, verifier, compiler, delai):
+    return [convertir_fichier(fichier, algo, cache, verifier, compiler, delai) for fichier in paquet]
+
+def _paquets(tailles, octets_max=64 * 1024, taille_max=32):
+    """
+    Regroupe les petits fichiers (tailles : fichier -> octets) pour qu'une
+    tâche du pool ne coûte pas plus en création et sérialisation qu'en
+    conversion. Un gros fichier reste seul.
+    """
+    paquet, octets = [], 0
+    for fichier, taille in sorted(tailles.items(), key=lambda element: element[1]):
+        if paquet and (octets + taille > octets_max or len(paquet) >= taille_max):
+            yield paquet
+            paquet, octets = [], 0
+        paquet.append(fichier)
+        octets += taille
+    if paquet:
+        yield paquet
+
+def lister_fichiers(chemins):
+    """Fichiers .general donnés directement ou contenus dans des répertoires."""
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            for nom in sorted(os.listdir(chemin)):
+                if nom.endswith(".general"):
+                    fichiers.append(os.path.join(chemin, nom))
+        else:
+            fichiers.append(chemin)
+    return fichiers
+
+def _bilan_echec(fichier, erreur):
+    return {"fichier": fichier, "chomsky": None, "greibach": None,
+            "succes_cache": 0, "echecs_cache": 0, "erreur": erreur}
+
+def convertir_lot(fichiers, algo="classique", travailleurs=None, cache=None, verifier=0, compiler=False, delai=None):
+    """
+    Convertit les fichiers dans un pool de processus. Renvoie les bilans dans l'ordre des fichiers.
+    Chaque fichier a au plus `delai` secondes (voir convertir_fichier). Un
+    travailleur tué (mémoire épuisée, signal) casse tout le pool : les
+    fichiers dont le résultat est perdu sont alors repris un par un, chacun
+    dans son propre processus, et celui qui le tue encore est noté en erreur.
+    Un fichier introuvable ou sans l'extension .general est noté en erreur
+    sans être envoyé au pool.
+    """
+    bilans = {}
+    tailles = {}
+    for fichier in fichiers:
+        if not fichier.endswith(".general"):
+            bilans[fichier] = _bilan_echec(fichier, ERREUR_EXTENSION)
+            continue
+        try:
+            tailles[fichier] = os.path.getsize(fichier)
+        except OSError as e:
+            bilans[fichier] = _bilan_echec(fichier, f"{type(e).__name__}: {e}")
+    a_reprendre = []
+    with ProcessPoolExecutor(max_workers=travailleurs) as pool:
+        taches = {pool.submit(_convertir_paquet, paquet, algo, cache, verifier, compiler, delai): paquet
+                  for paquet in _paquets(tailles)}
+        for tache in as_completed(taches):
+            try:
+                resultats = tache.result()
+            except BrokenProcessPool:
+                a_reprendre.extend(taches[tache])
+                continue
+            for bilan in resultats:
+                bilans[bilan["fichier"]] = bilan
+    for fichier in a_reprendre:
+        with ProcessPoolExecutor(max_workers=1) as seul:
+            try:
+                bilans[fichier] = seul.submit(_convertir_paquet, [fichier], algo, cache, verifier,
+                                              compiler, delai).result()[0]
+            except BrokenProcessPool:
+                bilans[fichier] = _bilan_echec(fichier, "processus travailleur arrêté (mémoire épuisée ou signal)")
+    return [bilans[fichier] for fichier in fichiers]
+
+def ecrire_bilan(bilans, fichier):
+    """Bilan par fichier (TSV) : durées de chaque conversion et erreur éventuelle."""
+    def duree(t):
+        return "" if t is None else f"{t:.6f}"
+    with open(fichier, "w") as f:
+        f.write("fichier\tchomsky_s\tgreibach_s\tsucces_cache\terreur\n")
+        for bilan in bilans:
+            f.write(f"{bilan['fichier']}\t{duree(bilan['chomsky'])}\t{duree(bilan['greibach'])}\t"
+                    f"{bilan['succes_cache']}\t{bilan['erreur'] or ''}\n")
+
 ##############################
 # MAIN
 ##############################
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        #print("python grammaire.py <fichier.general>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Mise en forme normale de Chomsky et de Greibach.")
+    parser.add_argument("fichiers", nargs="*",
+                        help="grammaires au format .general (ou répertoires qui en contiennent)")
+    parser.add_argument("--greibach", choices=["classique", "coin-gauche"], default="classique",
+                        help="algorithme de Greibach : substitutions successives (classique) "
+                             "ou transformation par coin gauche de taille polynomiale")
+    parser.add_argument("--comparer", action="store_true",
+                        help="affiche le nombre de règles produites par les deux algorithmes de Greibach")
+    parser.add_argument("--travailleurs", type=int, default=None,
+                        help="nombre de processus pour la conversion par lots (par défaut : nombre de coeurs)")
+    parser.add_argument("--bilan", default="bilan_conversion.tsv",
+                        help="fichier du bilan par grammaire en conversion par lots")
+    parser.add_argument("--delai", type=float, default=60,
+                        help="secondes accordées à chaque grammaire en conversion par lots (0 : sans limite)")
+    parser.add_argument("--cache", default=REPERTOIRE_CACHE,
+                        help="répertoire du cache des conversions")
+    parser.add_argument("--taille-cache", type=int, default=32,
+                        help="taille maximale du cache en Mo (les entrées les moins récemment utilisées sont supprimées)")
+    parser.add_argument("--sans-cache", action="store_true",
+                        help="refait toutes les conversions sans lire ni écrire le cache")
+    parser.add_argument("--vider-cache", action="store_true",
+                        help="supprime toutes les entrées du cache avant de convertir")
+    parser.add_argument("--stats", action="store_true",
+                        help="affiche sur la sortie d'erreur le nombre de succès et d'échecs du cache")
+    parser.add_argument("--verifier", type=int, default=0, metavar="LONGUEUR",
+                        help="après conversion, compare les langages des trois grammaires jusqu'à cette longueur "
+                             "(code de retour 1 au premier contre-exemple)")
+    parser.add_argument("--compiler", action="store_true",
+                        help="écrit aussi les grammaires converties au format binaire (.chomsky.bin, .greibach.bin) "
+                             "que Generateur charge sans découper de texte")
+    parser.add_argument("--profil", choices=["table", "json"],
+                        help="durée, règles, symboles et non-terminaux créés par chaque passe de conversion")
+    parser.add_argument("--profil-memoire", action="store_true",
+                        help="ajoute au profil la mémoire de chaque passe (tracemalloc, plus lent)")
+    args = parser.parse_args()
+
+    cache = CacheConversions(args.cache, args.taille_cache * 1024 * 1024, version_convertisseur())
+    if args.vider_cache:
+        print(f"{cache.vider()} entrées supprimées du cache", file=sys.stderr)
+    if not args.fichiers:
+        if args.vider_cache:
+            sys.exit(0)
+        parser.error("aucune grammaire à convertir")
+    if args.sans_cache:
+        cache = None
 
-    fichier_entree = sys.argv[1]
+    fichiers = lister_fichiers(args.fichiers)
+    if len(fichiers) > 1 or os.path.isdir(args.fichiers[0]):
+        if args.profil:
+            parser.error("--profil ne s'applique qu'à une seule grammaire")
+        # Conversion par lots dans un pool de processus
+        bilans = convertir_lot(fichiers, args.greibach, args.travailleurs, cache, args.verifier, args.compiler,
+                               args.delai)
+        ecrire_bilan(bilans, args.bilan)
+        erreurs = sum(1 for bilan in bilans if bilan["erreur"])
+        delais = sum(1 for bilan in bilans if (bilan["erreur"] or "").startswith("délai dépassé"))
+        arrets = sum(1 for bilan in bilans if (bilan["erreur"] or "").startswith("processus travailleur arrêté"))
+        print(f"{len(bilans)} grammaires converties, {erreurs} en erreur dont {delais} délais dépassés "
+              f"et {arrets} processus arrêtés (bilan dans {args.bilan})")
+        if args.stats and cache is not None:
+            # les processus ont chacun leur compteur : on refait le total depuis les bilans
+            cache.succes = sum(bilan["succes_cache"] for bilan in bilans)
+            cache.echecs = sum(bilan["echecs_cache"] for bilan in bilans)
+            print(cache.bilan(), file=sys.stderr)
+        sys.exit(1 if erreurs else 0)
+
+    fichier_entree = fichiers[0]
+    if not fichier_entree.endswith(".general"):
+        parser.error(f"{fichier_entree} : {ERREUR_EXTENSION}")
+    if not os.path.isfile(fichier_entree):
+        parser.error(f"{fichier_entree} : fichier introuvable")
     fichier_sortie_chom = fichier_entree.replace(".general", ".chomsky")
     fichier_sortie_grei = fichier_entree.replace(".general", ".greibach")
 
+    profils = {}
+    def observateur(etape):
+        if not args.profil:
+            return None
+        profils[etape] = ProfilPasses(args.profil_memoire)
+        return profils[etape]
+
     # Partie Chomsky
-    g_chomsky = Grammaire()
-    g_chomsky.lire(fichier_entree)
-    g_chomsky.chomsky()
-    g_chomsky.ecrire(fichier_sortie_chom)
+    ecrire_sortie(fichier_sortie_chom, convertir(fichier_entree, "chomsky", cache, observateur("chomsky")),
+                  args.compiler)
     #print(f"forme normale de Chomsky dans {fichier_sortie_chom}.")
 
     # Partie Greibach
-    g_greibach = Grammaire()
-    g_greibach.lire(fichier_entree)
-    g_greibach.greibach()
-    g_greibach.ecrire(fichier_sortie_grei)
-    #print(f"forme normale de Greibach dans {fichier_sortie_grei}")
\ No newline at end of file
+    resultats = {}
+    for algo in ["classique", "coin-gauche"]:
+        if algo != args.greibach and not args.comparer:
+            continue
+        texte = convertir(fichier_entree, algo, cache, observateur(f"greibach {algo}"))
+        resultats[algo] = nombre_regles_texte(texte)
+        if algo == args.greibach:
+            ecrire_sortie(fichier_sortie_grei, texte, args.compiler)
+    #print(f"forme normale de Greibach dans {fichier_sortie_grei}")
+    if args.comparer:
+        for algo, nombre in resultats.items():
+            print(f"Greibach {algo} : {nombre} règles")
+    if args.stats and cache is not None:
+        print(cache.bilan(), file=sys.stderr)
+    for profil in profils.values():
+        profil.terminer()
+    if args.verifier:
+        contre_exemple = verifier_conversion(fichier_entree, args.verifier)
+        if contre_exemple:
+            print(contre_exemple, file=sys.stderr)
+            sys.exit(1)
+    if args.profil == "json":
+        print(json.dumps({etape: profil.passes for etape, profil in profils.items()}, indent=1, ensure_ascii=False))
+    elif args.profil == "table":
+        for etape, profil in profils.items():
+            print(f"== {etape}")
+            print(profil.tableau())
@@ -0,0 +1,361 @@
+import sys
+import argparse
+
+from Grammaire import Grammaire
+
+# entrées du cache des combinaisons de CYK (environ 200 octets chacune) :
+# au-delà, il est vidé, sinon il grandit à chaque mot nouveau
+COMBINAISONS_MAX = 1 << 16
+
+##############################
+# Reconnaissance CYK
+##############################
+class ReconnaisseurCYK:
+    """
+    Test d'appartenance d'un mot au langage d'une grammaire en forme normale
+    de Chomsky (celle produite par Grammaire.chomsky()).
+    Chaque case de la table CYK est un entier utilisé comme masque de bits :
+    le bit i est à 1 si le non-terminal d'indice i engendre le sous-mot.
+    Le coût reste cubique en la longueur du mot : pour 200 lettres, de
+    l'ordre de 0,1 s (test3.general) à 0,5 s (grammaire "moyenne" de
+    Benchmark.py, 36 non-terminaux en forme de Chomsky).
+    """
+    def __init__(self, grammaire):
+        self.axiome = grammaire.axiome
+        self.regles = grammaire.regles
+
+        # indice de chaque non-terminal dans les masques
+        self.indices = {nt: i for i, nt in enumerate(self.regles)}
+        self.axiome_masque = 1 << self.indices[self.axiome] if self.axiome in self.indices else 0
+        self.accepte_vide = () in self.regles.get(self.axiome, [])
+
+        # unites[i] = masque des NT X tels que X =>* A_i par règles unitaires
+        self.unites = self._clotures_unitaires()
+
+        # lettre -> masque des NT qui la produisent
+        self.terminaux = {}
+        # (B, C) -> masque des NT A tels que A -> BC
+        self.binaires = {}
+        # B -> masque des C tels que (B, C) est une paire indexée
+        self.droites_de = {}
+        terminal = grammaire.symboles.terminal
+        for gauche, sequences in self.regles.items():
+            tete = self.unites[self.indices[gauche]]
+            for seq in sequences:
+                if len(seq) == 1 and terminal[seq[0]]:
+                    lettre = grammaire.symboles.nom(seq[0])
+                    self.terminaux[lettre] = self.terminaux.get(lettre, 0) | tete
+                elif len(seq) == 2 and seq[0] in self.indices and seq[1] in self.indices:
+                    b, c = self.indices[seq[0]], self.indices[seq[1]]
+                    self.binaires[(b, c)] = self.binaires.get((b, c), 0) | tete
+                    self.droites_de[b] = self.droites_de.get(b, 0) | (1 << c)
+
+        # cache (masque gauche, masque droit) -> masque résultat, au plus COMBINAISONS_MAX entrées
+        self._combinaisons = {}
+
+    def _clotures_unitaires(self):
+        """
+        Calcule, pour chaque non-terminal, le masque des non-terminaux qui s'y
+        réécrivent par une chaîne de règles unitaires A -> B (lui compris).
+        Permet de tolérer les règles unitaires restantes sans coût à l'exécution.
+        """
+        parents = {i: 0 for i in self.indices.values()}
+        for gauche, sequences in self.regles.items():
+            for seq in sequences:
+                if len(seq) == 1 and seq[0] in self.indices:
+                    parents[self.indices[seq[0]]] |= 1 << self.indices[gauche]
+        unites = {}
+        for i in parents:
+            masque = 1 << i
+            a_voir = [i]
+            while a_voir:
+                j = a_voir.pop()
+                nouveaux = parents[j] & ~masque
+                masque |= nouveaux
+                a_voir.extend(self._bits(nouveaux))
+            unites[i] = masque
+        return unites
+
+    @staticmethod
+    def _bits(masque):
+        """Indices des bits à 1 d'un masque."""
+        while masque:
+            bas = masque & -masque
+            yield bas.bit_length() - 1
+            masque ^= bas
+
+    def _combiner(self, gauche, droite):
+        """Masque des NT A tels que A -> BC avec B dans gauche et C dans droite."""
+        cle = (gauche, droite)
+        resultat = self._combinaisons.get(cle)
+        if resultat is None:
+            resultat = 0
+            for b in self._bits(gauche):
+                commun = droite & self.droites_de.get(b, 0)
+                for c in self._bits(commun):
+                    resultat |= self.binaires[(b, c)]
+            if len(self._combinaisons) >= COMBINAISONS_MAX:
+                self._combinaisons.clear()
+            self._combinaisons[cle] = resultat
+        return resultat
+
+    def appartient(self, mot):
+        """Renvoie True si le mot est engendré par la grammaire."""
+        n = len(mot)
+        if n == 0:
+            return self.accepte_vide
+        # debut[i][l-1] = masque des NT engendrant mot[i:i+l]
+        # fin[j][l-1] = masque des NT engendrant mot[j-l:j]
+        debut = []
+        fin = [[]]
+        for lettre in mot:
+            masque = self.terminaux.get(lettre, 0)
+            if not masque:
+                return False
+            debut.append([masque])
+            fin.append([masque])
+        combinaisons = self._combinaisons
+        combiner = self._combiner
+        for l in range(2, n + 1):
+            for i in range(n - l + 1):
+                j = i + l
+                masque = 0
+                # sous-mot gauche de longueur m, droit de longueur l - m
+                for gauche, droite in zip(debut[i], reversed(fin[j])):
+                    if gauche and droite:
+                        resultat = combinaisons.get((gauche, droite))
+                        if resultat is None:
+                            resultat = combiner(gauche, droite)
+                        masque |= resultat
+                debut[i].append(masque)
+                fin[j].append(masque)
+        return bool(debut[0][n - 1] & self.axiome_masque)
+
+##############################
+# Reconnaissance d'Earley
+##############################
+class ReconnaisseurEarley:
+    """
+    Test d'appartenance directement sur la grammaire lue (sans mise en forme
+    normale) : epsilon, règles unitaires et récursivité gauche sont acceptés.
+    Un item (règle, point, origine) attend le symbole qui suit le point ; à
+    chaque position, les items sont rangés par symbole attendu, si bien que
+    la complétion d'un A et la lecture d'une lettre ne parcourent que les
+    items qui attendent ce symbole.
+    Les annulables sont traités à la prédiction (Aycock et Horspool) : en
+    prédisant un A annulable, on avance aussi le point au-delà de A.
+    Les chaînes de complétions déterministes (récursivité droite) sont
+    raccourcies à la manière de Leo : sans cela, un mot comme abab...ab pour
+    S -> aSbS | E coûterait un temps quadratique.
+    """
+    def __init__(self, grammaire):
+        self.axiome = grammaire.axiome
+        self.symboles = grammaire.symboles
+        self.terminal = grammaire.symboles.terminal
+        self.annulables = grammaire._trouver_annulables()
+        # règles numérotées : tetes[r] -> droites[r]
+        self.tetes = []
+        self.droites = []
+        self.regles_de = {}
+        for gauche, sequences in grammaire.regles.items():
+            for seq in sequences:
+                self.regles_de.setdefault(gauche, []).append(len(self.tetes))
+                self.tetes.append(gauche)
+                self.droites.append(seq)
+        # règle de départ S' -> S (tête -1) : l'item complet (depart, 1, 0) marque un mot accepté,
+        # même quand les items intermédiaires d'une chaîne de Leo ne sont pas ajoutés
+        self.depart = len(self.tetes)
+        self.tetes.append(-1)
+        self.droites.append((self.axiome,))
+
+    def _leo(self, attente, leo, j, symbole):
+        """
+        Item complet au sommet de la chaîne déterministe qui part de la
+        complétion d'un `symbole` commencé en j, ou None. La chaîne monte tant
+        qu'un seul item attend le symbole et qu'il se termine juste après lui.
+        Les positions parcourues sont terminées, les résultats sont mémorisés
+        dans leo[position].
+        """
+        chaine = []
+        vus = set()
+        haut = None
+        while (j, symbole) not in vus:
+            vus.add((j, symbole))
+            if symbole in leo[j]:
+                haut = leo[j][symbole]
+                break
+            attendus = attente[j].get(symbole, ())
+            if len(attendus) != 1 or attendus[0][1] + 1 != len(self.droites[attendus[0][0]]):
+                leo[j][symbole] = None
+                break
+            r, point, origine = attendus[0]
+            chaine.append((j, symbole, (r, point + 1, origine)))
+            j, symbole = origine, self.tetes[r]
+        for position, s, item in reversed(chaine):
+            if haut is None:
+                haut = item
+            leo[position][s] = haut
+        return haut
+
+    def _cloturer(self, i, suivants, attente, leo):
+        """
+        Construit la colonne i à partir des items reportés par la lecture
+        (prédictions et complétions). Ajoute attente[i] et leo[i], qui ne
+        dépendent que du préfixe lu : les colonnes 0..i restent valables pour
+        tout mot qui commence par ce préfixe. Renvoie les items de la colonne.
+        """
+        tetes, droites, regles_de = self.tetes, self.droites, self.regles_de
+        terminal, annulables = self.terminal, self.annulables
+        attente_i = {}
+        attente.append(attente_i)
+        leo.append({})
+        items = set(suivants)
+        a_traiter = list(items)
+        predits = set()
+        while a_traiter:
+            r, point, origine = a_traiter.pop()
+            droite = droites[r]
+            if point == len(droite):
+                # complétion : les items qui attendaient la tête avancent,
+                # ou seulement le sommet de la chaîne de Leo (origine terminée)
+                tete = tetes[r]
+                haut = None
+                if origine < i:
+                    memo = leo[origine]
+                    haut = memo[tete] if tete in memo else self._leo(attente, leo, origine, tete)
+                if haut is not None:
+                    nouveaux = [haut]
+                else:
+                    nouveaux = [(r2, p2 + 1, o2) for r2, p2, o2 in attente[origine].get(tete, ())]
+            else:
+                symbole = droite[point]
+                attente_i.setdefault(symbole, []).append((r, point, origine))
+                if terminal[symbole]:
+                    continue
+                nouveaux = []
+                if symbole not in predits:
+                    predits.add(symbole)
+                    nouveaux = [(r2, 0, i) for r2 in regles_de.get(symbole, ())]
+                if symbole in annulables:
+                    nouveaux.append((r, point + 1, origine))
+            for item in nouveaux:
+                if item not in items:
+                    items.add(item)
+                    a_traiter.append(item)
+        return items
+
+    def _lire_lettre(self, attente_i, lettre):
+        """Items reportés en lisant une lettre : seuls ceux qui l'attendent avancent."""
+        i = self.symboles.ids.get(lettre)
+        if i is None or not self.terminal[i]:
+            return []
+        return [(r, point + 1, origine) for r, point, origine in attente_i.get(i, ())]
+
+    def appartient(self, mot):
+        """Renvoie True si le mot est engendré par la grammaire."""
+        if self.axiome not in self.regles_de:
+            return False
+        attente, leo = [], []
+        items = self._cloturer(0, [(self.depart, 0, 0)], attente, leo)
+        for i, lettre in enumerate(mot):
+            suivants = self._lire_lettre(attente[i], lettre)
+            if not suivants:
+                return False
+            items = self._cloturer(i + 1, suivants, attente, leo)
+        return (self.depart, 1, 0) in items
+
+    def appartiennent(self, mots):
+        """
+        Résultats (booléens) d'une liste de mots, dans le même ordre. Les mots
+        sont rangés dans un arbre de préfixes parcouru en profondeur : la pile
+        des colonnes suit le chemin courant, chaque préfixe commun n'est donc
+        analysé qu'une fois, et un préfixe sans suite possible rejette d'un
+        coup tous les mots qui le prolongent.
+        """
+        resultats = [False] * len(mots)
+        if self.axiome not in self.regles_de:
+            return resultats
+        # noeud = (enfants : lettre -> noeud, indices des mots qui s'arrêtent là)
+        racine = ({}, [])
+        for k, mot in enumerate(mots):
+            noeud = racine
+            for lettre in mot:
+                enfants = noeud[0]
+                if lettre not in enfants:
+                    enfants[lettre] = ({}, [])
+                noeud = enfants[lettre]
+            noeud[1].append(k)
+
+        attente, leo = [], []
+        items = self._cloturer(0, [(self.depart, 0, 0)], attente, leo)
+        for k in racine[1]:
+            resultats[k] = (self.depart, 1, 0) in items
+        # pile de (profondeur du parent, lettre, noeud)
+        pile = [(0, lettre, enfant) for lettre, enfant in racine[0].items()]
+        while pile:
+            profondeur, lettre, noeud = pile.pop()
+            # on remonte au parent : les colonnes au-delà appartiennent à une autre branche
+            del attente[profondeur + 1:]
+            del leo[profondeur + 1:]
+            suivants = self._lire_lettre(attente[profondeur], lettre)
+            if not suivants:
+                continue
+            items = self._cloturer(profondeur + 1, suivants, attente, leo)
+            if noeud[1]:
+                accepte = (self.depart, 1, 0) in items
+                for k in noeud[1]:
+                    resultats[k] = accepte
+            pile.extend((profondeur + 1, l, enfant) for l, enfant in noeud[0].items())
+        return resultats
+
+##############################
+# MAIN
+##############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test d'appartenance de mots au langage d'une grammaire.")
+    parser.add_argument("fichier", help="grammaire au format .general")
+    parser.add_argument("mots", nargs="*", help="mots à tester (le mot vide se note E)")
+    parser.add_argument("--fichier-mots",
+                        help="fichier de mots à tester, un par ligne (- pour l'entrée standard) ; "
+                             "avec Earley, les préfixes communs ne sont analysés qu'une fois")
+    parser.add_argument("--lot", type=int, default=100000,
+                        help="nombre de mots analysés ensemble avant d'écrire leurs résultats")
+    parser.add_argument("--algo", choices=["earley", "cyk"], default="earley",
+                        help="earley : directement sur la grammaire lue ; "
+                             "cyk : après mise en forme normale de Chomsky")
+    args = parser.parse_args()
+    if not args.mots and not args.fichier_mots:
+        parser.error("aucun mot à tester")
+
+    grammaire = Grammaire()
+    grammaire.lire(args.fichier)
+    if args.algo == "cyk":
+        grammaire.chomsky()
+        reconnaisseur = ReconnaisseurCYK(grammaire)
+    else:
+        reconnaisseur = ReconnaisseurEarley(grammaire)
+
+    def tester(mots):
+        # le mot vide peut être noté "E"
+        mots_lus = ["" if mot == "E" else mot for mot in mots]
+        if args.algo == "earley":
+            resultats = reconnaisseur.appartiennent(mots_lus)
+        else:
+            resultats = [reconnaisseur.appartient(mot) for mot in mots_lus]
+        sys.stdout.write("".join(f"{mot} : {'accepté' if ok else 'rejeté'}\n"
+                                 for mot, ok in zip(mots, resultats)))
+
+    if args.mots:
+        tester(args.mots)
+    if args.fichier_mots:
+        # les résultats sortent par lots, dans l'ordre du fichier
+        entree = sys.stdin if args.fichier_mots == "-" else open(args.fichier_mots)
+        with entree:
+            lot = []
+            for ligne in entree:
+                lot.append(ligne.rstrip("\r\n"))
+                if len(lot) >= args.lot:
+                    tester(lot)
+                    lot = []
+            if lot:
+                tester(lot)
@@ -0,0 +1,350 @@
+import os
+import sys
+import json
+import signal
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from Cache import CacheMemoire, taille_objet
+from Compilation import GrammaireCompilee
+from Generateur import Generateur
+from Grammaire import Grammaire, DelaiDepasse, _delai_depasse
+from Reconnaisseur import ReconnaisseurEarley
+
+SOCKET_DEFAUT = os.path.join(tempfile.gettempdir(), f"grammaires-{os.getuid()}.sock")
+FORMES = ["chomsky", "classique", "coin-gauche"]
+TAILLE_LIGNE_MAX = 256 * 1024 * 1024  # une requête ou une réponse tient sur une ligne
+
+def empreinte(texte):
+    return hashlib.sha256(texte.encode()).hexdigest()
+
+##############################
+# Travailleurs
+##############################
+# Objets construits (Generateur, ReconnaisseurEarley), propres à chaque
+# processus travailleur : les requêtes suivantes sur la même grammaire
+# n'ont plus à la découper ni à refaire les précalculs.
+_objets = None
+_budget = None
+
+def _initialiser(budget):
+    global _objets, _budget
+    _objets = CacheMemoire(budget)
+    _budget = budget
+    signal.signal(signal.SIGALRM, _delai_depasse)
+
+def _avec_delai(delai, fonction, *args):
+    """
+    Appelle fonction(*args) en l'interrompant (SIGALRM) après `delai`
+    secondes, comme convertir_fichier. Un calcul interrompu a pu laisser un
+    objet construit à moitié mis à jour : le cache du travailleur est vidé.
+    """
+    global _objets
+    if not delai:
+        return fonction(*args)
+    try:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, delai)
+            return fonction(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except DelaiDepasse:
+        _objets = CacheMemoire(_budget)
+        raise DelaiDepasse(f"délai dépassé ({delai:g} s)") from None
+
+def _objet(genre, cle, construire):
+    objet = _objets.lire((genre, cle))
+    if objet is None:
+        objet = construire()
+        _objets.ecrire((genre, cle), objet, taille_objet(objet))
+    return objet
+
+def _normaliser(texte, forme):
+    grammaire = Grammaire()
+    grammaire.lire_texte(texte)
+    if forme == "chomsky":
+        grammaire.chomsky()
+    elif forme == "classique":
+        grammaire.greibach()
+    else:
+        grammaire.greibach_polynomiale()
+    return grammaire.texte()
+
+def _enumerer(cle, texte, longueur):
+    generateur = _objet("generateur", cle, lambda: Generateur(GrammaireCompilee.depuis_texte(texte), 0))
+    # les longueurs minimales sont réutilisées, les expansions refaites seulement pour une longueur plus grande
+    if generateur.changer_longueur(longueur):
+        _objets.ecrire(("generateur", cle), generateur, taille_objet(generateur))
+    # les tables de l'énumération sont libérées à la fin (Generateur._iterer_tables)
+    return list(generateur.iterer_mots(tables=True))
+
+def _appartiennent(cle, texte, mots):
+    def construire():
+        grammaire = Grammaire()
+        grammaire.lire_texte(texte)
+        return ReconnaisseurEarley(grammaire)
+    return _objet("reconnaisseur", cle, construire).appartiennent(mots)
+
+##############################
+# Service
+##############################
+class Service:
+    """
+    Service de longue durée : les requêtes arrivent en lignes JSON sur un
+    socket Unix et sont traitées en même temps (asyncio). Les calculs partent
+    dans un pool de processus, une requête lente ne bloque donc pas les
+    autres. Les formes normales et les mots énumérés sont gardés dans un
+    cache LRU en mémoire, et deux requêtes identiques en cours partagent le
+    même calcul.
+    Requêtes (champ "id" facultatif, renvoyé tel quel) :
+      {"operation": "normaliser", "grammaire": texte .general, "forme": "chomsky" | "classique" | "coin-gauche"}
+      {"operation": "enumerer", "grammaire": ..., "longueur": k, "forme": "general" (défaut) ou une forme normale}
+      {"operation": "appartient", "grammaire": ..., "mots": [...]}
+      {"operation": "stats"}, {"operation": "arreter"}
+    Réponse : {"ok": true, ...résultat} ou {"ok": false, "erreur": message}.
+    Chaque calcul a au plus `delai` secondes (0 : sans limite), au-delà la
+    requête reçoit l'erreur "délai dépassé" et le travailleur est libéré :
+    l'algorithme de Greibach classique ne termine pas sur toutes les
+    grammaires. Un travailleur mort (mémoire épuisée, signal) fait échouer
+    les requêtes qu'il traitait et le pool est remplacé.
+    """
+    def __init__(self, travailleurs=None, budget=256 * 1024 * 1024, delai=60):
+        self.resultats = CacheMemoire(budget)
+        self.en_cours = {}  # clé -> tâche partagée par les requêtes identiques
+        self.travailleurs = travailleurs
+        self.budget = budget
+        self.delai = delai
+        self.pool = self._nouveau_pool()
+        self.arret = asyncio.Event()
+        self.requetes = 0
+
+    def _nouveau_pool(self):
+        # forkserver : les travailleurs n'héritent pas des sockets ouverts du service
+        return ProcessPoolExecutor(self.travailleurs, mp_context=multiprocessing.get_context("forkserver"),
+                                   initializer=_initialiser, initargs=(self.budget,))
+
+    async def _executer(self, fonction, *args):
+        pool = self.pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, _avec_delai, self.delai, fonction, *args)
+        except BrokenProcessPool:
+            # un seul remplacement pour toutes les requêtes du pool cassé
+            if self.pool is pool:
+                self.pool = self._nouveau_pool()
+                self._terminer(pool)
+            raise
+
+    @staticmethod
+    def _terminer(pool):
+        """Arrête un pool sans attendre ses calculs : ses processus sont tués."""
+        # _processes est vidé par shutdown : on relève les processus avant
+        processus = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for p in processus:
+            p.terminate()
+        for p in processus:
+            p.join()
+
+    def fermer(self):
+        """Arrête les travailleurs, y compris ceux encore occupés par un calcul."""
+        self._terminer(self.pool)
+
+    async def _calculer(self, cle, fonction, *args):
+        """Résultat en cache, sinon calculé une seule fois dans le pool."""
+        resultat = self.resultats.lire(cle)
+        if resultat is not None:
+            return resultat
+        tache = self.en_cours.get(cle)
+        if tache is None:
+            tache = self.en_cours[cle] = asyncio.ensure_future(self._lancer(cle, fonction, *args))
+        # shield : une requête abandonnée n'annule pas le calcul des autres
+        return await asyncio.shield(tache)
+
+    async def _lancer(self, cle, fonction, *args):
+        try:
+            resultat = await self._executer(fonction, *args)
+            self.resultats.ecrire(cle, resultat, taille_objet(resultat))
+            return resultat
+        finally:
+            del self.en_cours[cle]
+
+    async def _forme(self, texte, forme):
+        if forme not in FORMES:
+            raise ValueError(f"forme inconnue : {forme}")
+        return await self._calculer(("forme", empreinte(texte), forme), _normaliser, texte, forme)
+
+    async def traiter(self, requete):
+        """Réponse (sans "ok" ni "id") à une requête décodée."""
+        self.requetes += 1
+        operation = requete.get("operation")
+        if operation == "stats":
+            return {"requetes": self.requetes, "en_cours": len(self.en_cours), "cache": self.resultats.bilan()}
+        if operation == "arreter":
+            self.arret.set()
+            return {}
+        if operation not in ("normaliser", "enumerer", "appartient"):
+            raise ValueError(f"opération inconnue : {operation}")
+        texte = requete["grammaire"]
+        if operation == "normaliser":
+            return {"grammaire": await self._forme(texte, requete.get("forme", "chomsky"))}
+        if operation == "enumerer":
+            forme = requete.get("forme", "general")
+            if forme != "general":
+                texte = await self._forme(texte, forme)
+            longueur = int(requete["longueur"])
+            cle = empreinte(texte)
+            return {"mots": await self._calculer(("mots", cle, longueur), _enumerer, cle, texte, longueur)}
+        # appartient : les réponses ne sont pas gardées, le reconnaisseur l'est (dans le travailleur)
+        return {"resultats": await self._executer(_appartiennent, empreinte(texte), texte, requete["mots"])}
+
+    async def _repondre(self, ligne, ecrivain):
+        requete = None
+        try:
+            requete = json.loads(ligne)
+            reponse = await self.traiter(requete)
+            reponse["ok"] = True
+        except Exception as e:
+            reponse = {"ok": False, "erreur": f"{type(e).__name__}: {e}"}
+        if isinstance(requete, dict) and "id" in requete:
+            reponse["id"] = requete["id"]
+        try:
+            ecrivain.write(json.dumps(reponse, ensure_ascii=False).encode() + b"\n")
+            await ecrivain.drain()
+        except ConnectionError:
+            pass  # le client est parti sans attendre sa réponse
+
+    async def servir_client(self, lecteur, ecrivain):
+        """Lit les requêtes d'une connexion jusqu'à sa fermeture ; chacune est traitée à part."""
+        taches = set()
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                tache = asyncio.ensure_future(self._repondre(ligne, ecrivain))
+                taches.add(tache)
+                tache.add_done_callback(taches.discard)
+            if taches:
+                await asyncio.gather(*taches)
+        except asyncio.CancelledError:
+            pass  # arrêt du service pendant que la connexion était ouverte
+        finally:
+            ecrivain.close()
+
+async def servir(chemin=SOCKET_DEFAUT, travailleurs=None, budget=256 * 1024 * 1024, delai=60):
+    """Lance le service sur le socket Unix `chemin` jusqu'à une requête "arreter"."""
+    if os.path.exists(chemin):
+        # un socket laissé par un service arrêté brutalement est remplacé, pas un service actif
+        try:
+            with socket.socket(socket.AF_UNIX) as s:
+                s.connect(chemin)
+            raise RuntimeError(f"un service écoute déjà sur {chemin}")
+        except ConnectionRefusedError:
+            os.remove(chemin)
+    service = Service(travailleurs, budget, delai)
+    for signal_arret in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signal_arret, service.arret.set)
+    serveur = await asyncio.start_unix_server(service.servir_client, path=chemin, limit=TAILLE_LIGNE_MAX)
+    print(f"Service à l'écoute sur {chemin}", file=sys.stderr)
+    try:
+        async with serveur:
+            await service.arret.wait()
+    finally:
+        service.fermer()
+        if os.path.exists(chemin):
+            os.remove(chemin)
+
+##############################
+# Client
+##############################
+def envoyer(requetes, chemin=SOCKET_DEFAUT):
+    """
+    Envoie des requêtes sur une seule connexion (elles sont traitées en même
+    temps) et renvoie les réponses dans l'ordre des requêtes.
+    """
+    reponses = [None] * len(requetes)
+    with socket.socket(socket.AF_UNIX) as s:
+        s.connect(chemin)
+        with s.makefile("rwb") as flux:
+            for i, requete in enumerate(requetes):
+                flux.write(json.dumps(dict(requete, id=i)).encode() + b"\n")
+            flux.flush()
+            s.shutdown(socket.SHUT_WR)
+            for _ in requetes:
+                ligne = flux.readline()
+                if not ligne:
+                    raise ConnectionError("le service a fermé la connexion avant de tout renvoyer")
+                reponse = json.loads(ligne)
+                reponses[reponse.pop("id")] = reponse
+    return reponses
+
+##############################
+# MAIN
+##############################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service de conversion, d'énumération et de reconnaissance "
+                                                 "qui garde les grammaires en mémoire entre les requêtes.")
+    parser.add_argument("--socket", default=SOCKET_DEFAUT, help="chemin du socket Unix du service")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+    serveur = commandes.add_parser("serveur", help="lance le service")
+    serveur.add_argument("--travailleurs", type=int, default=None,
+                         help="nombre de processus de calcul (par défaut : nombre de coeurs)")
+    serveur.add_argument("--memoire", type=int, default=256,
+                         help="budget en Mo du cache des résultats et de celui de chaque travailleur")
+    serveur.add_argument("--delai", type=float, default=60,
+                         help="secondes accordées à chaque calcul (0 : sans limite)")
+    normaliser = commandes.add_parser("normaliser", help="écrit une forme normale de la grammaire")
+    normaliser.add_argument("fichier", help="grammaire au format .general")
+    normaliser.add_argument("--forme", choices=FORMES, default="chomsky")
+    enumerer = commandes.add_parser("enumerer", help="écrit les mots de longueur <= longueur_max")
+    enumerer.add_argument("longueur_max", type=int)
+    enumerer.add_argument("fichier", help="grammaire au format .general")
+    enumerer.add_argument("--forme", choices=["general"] + FORMES, default="general",
+                          help="énumère sur la grammaire telle quelle ou sur une de ses formes normales")
+    appartient = commandes.add_parser("appartient", help="teste l'appartenance de mots")
+    appartient.add_argument("fichier", help="grammaire au format .general")
+    appartient.add_argument("mots", nargs="+", help="mots à tester (le mot vide se note E)")
+    commandes.add_parser("stats", help="affiche l'état du service")
+    commandes.add_parser("arreter", help="arrête le service")
+    args = parser.parse_args()
+
+    if args.commande == "serveur":
+        try:
+            asyncio.run(servir(args.socket, args.travailleurs, args.memoire * 1024 * 1024, args.delai))
+        except RuntimeError as e:
+            sys.exit(str(e))
+        sys.exit(0)
+
+    requete = {"operation": args.commande}
+    if hasattr(args, "fichier"):
+        with open(args.fichier) as f:
+            requete["grammaire"] = f.read()
+    if args.commande == "normaliser":
+        requete["forme"] = args.forme
+    elif args.commande == "enumerer":
+        requete.update(forme=args.forme, longueur=args.longueur_max)
+    elif args.commande == "appartient":
+        requete["mots"] = ["" if mot == "E" else mot for mot in args.mots]
+    try:
+        reponse, = envoyer([requete], args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(f"aucun service sur {args.socket} (python Service.py serveur)")
+    except ConnectionError as e:
+        sys.exit(str(e))  # service arrêté pendant la requête
+    if not reponse.pop("ok"):
+        sys.exit(reponse["erreur"])
+    if args.commande == "normaliser":
+        sys.stdout.write(reponse["grammaire"])
+    elif args.commande == "enumerer":
+        sys.stdout.write("".join(mot + "\n" for mot in reponse["mots"]))
+    elif args.commande == "appartient":
+        sys.stdout.write("".join(f"{mot} : {'accepté' if ok else 'rejeté'}\n"
+                                 for mot, ok in zip(args.mots, reponse["resultats"])))
+    elif args.commande == "stats":
+        print(json.dumps(reponse, indent=1, ensure_ascii=False))